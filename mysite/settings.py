@@ -29,9 +29,57 @@ ALLOWED_HOSTS = []
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'products.pagination.KeysetPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'products.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'products.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
+
+# Responses at least this many bytes long are gzip-compressed for clients
+# that accept it.
+GZIP_MIN_LENGTH = 1024
+
+# In-process token cache used by CachedTokenAuthentication: maximum number of
+# tokens kept, and seconds before a cached token is looked up again.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+# Maximum age in seconds of the cached admin dashboard payload. Writes through
+# this process invalidate it immediately; this bounds staleness elsewhere.
+ADMIN_DASHBOARD_CACHE_TIMEOUT = 30
+
+# Requests slower than this many seconds are logged with their SQL to the
+# 'products.slow_requests' logger.
+SLOW_REQUEST_THRESHOLD = 1.0
+
+# Password hashing for login and registration runs on a bounded pool of this
+# many threads (default: one per CPU) with at most PASSWORD_HASH_QUEUE jobs
+# waiting; beyond that login/register answer 503.
+PASSWORD_HASH_WORKERS = None
+PASSWORD_HASH_QUEUE = 16
+
+# Threads per process the async dashboards run their queries on, each with
+# its own database connection.
+ASYNC_QUERY_WORKERS = 4
+
+AUTHENTICATION_BACKENDS = ['users.backends.PooledModelBackend']
+
+# Seconds a pending service request holds its product's stock before the
+# release_expired_reservations sweeper gives it back. Starting work on the
+# request keeps the hold until it closes.
+STOCK_RESERVATION_TTL = 48 * 60 * 60
+
+# Seconds readers of the service request event log wait for a missing id
+# (a transaction that took it but hasn't committed yet) before skipping it.
+EVENT_LOG_SETTLE_SECONDS = 5
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -50,6 +98,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'products.middleware.MetricsMiddleware',  # First, so its timings cover the whole stack
+    'products.middleware.CompressionMiddleware',  # Before anything that reads the response body
+    'products.middleware.ReplicaRoutingMiddleware',  # Before anything that reads the database
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -109,9 +160,23 @@ DATABASES = {
         'PASSWORD': 'admin',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Keep connections between requests; the async dashboards' query
+        # threads hold one each (see ASYNC_QUERY_WORKERS).
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Read replicas: aliases in DATABASES that GET/HEAD/OPTIONS requests read
+# from, e.g. ['replica'] with a 'replica' entry above carrying
+# 'TEST': {'MIRROR': 'default'} so tests use a single database. After a
+# client writes (POST/PUT/PATCH/DELETE), a signed cookie keeps its reads on
+# the primary for REPLICA_STICKY_SECONDS.
+# To try it locally, point 'default' and 'replica' at two SQLite files and
+# copy the migrated primary file over the replica one.
+REPLICA_DATABASES = []
+REPLICA_STICKY_SECONDS = 5
+DATABASE_ROUTERS = ['products.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,120 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+
+from users.authentication import CachedTokenAuthentication
+
+from .cache import admin_dashboard_cache
+from .middleware import current_query_recorder
+from .views import AdminDashboardAPIView, UserDashboardAPIView
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def query_executor():
+    """
+    The pool the dashboards' queries run on: ASYNC_QUERY_WORKERS threads, each
+    keeping its own database connection for CONN_MAX_AGE seconds, so a process
+    never holds more than that many extra connections.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_QUERY_WORKERS', 4), thread_name_prefix='async-query'
+            )
+        return _executor
+
+
+async def run_in_thread(func, *args):
+    """
+    Run a blocking ORM call on the query pool, so several can be awaited
+    concurrently with asyncio.gather().
+
+    sync_to_async's default thread_sensitive=True would funnel them all through
+    one thread and connection, one after another. The call sees the request's
+    context (replica routing, the metrics query recorder); like a request, it
+    drops a connection that is too old or broken before and after running.
+    """
+    context = contextvars.copy_context()
+
+    def call():
+        close_old_connections()
+        try:
+            with ExitStack() as stack:
+                recorder = current_query_recorder.get()
+                if recorder is not None:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(recorder))
+                return func(*args)
+        finally:
+            close_old_connections()
+    return await asyncio.get_running_loop().run_in_executor(query_executor(), context.run, call)
+
+
+async def user_dashboard_payload(user):
+    counts, recent = await asyncio.gather(
+        run_in_thread(UserDashboardAPIView.get_counts, user),
+        run_in_thread(UserDashboardAPIView.get_recent_requests, user),
+    )
+    return {**counts, 'recent_requests': recent}
+
+
+async def admin_dashboard_payload(user):
+    return await admin_dashboard_cache.aget_or_build(build_admin_payload)
+
+
+async def build_admin_payload():
+    counts, recent, low_stock = await asyncio.gather(
+        run_in_thread(AdminDashboardAPIView.get_counts),
+        run_in_thread(AdminDashboardAPIView.get_recent_requests),
+        run_in_thread(AdminDashboardAPIView.get_low_stock_products),
+    )
+    return {**counts, 'recent_requests': recent, 'low_stock_products': low_stock}
+
+
+class AsyncDashboardView(View):
+    """
+    Async counterpart of the DRF dashboard views for the ASGI stack.
+
+    Authenticates with CachedTokenAuthentication and mirrors the DRF
+    permission responses, then answers with `build_payload(user)`, a
+    coroutine function whose queries run in parallel. Set it on a subclass
+    or pass it to as_view().
+    """
+    staff_only = False
+    build_payload = None
+
+    async def get(self, request):
+        try:
+            result = await sync_to_async(CachedTokenAuthentication().authenticate)(request)
+        except exceptions.AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=401, headers={'WWW-Authenticate': 'Token'})
+        if result is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401, headers={'WWW-Authenticate': 'Token'},
+            )
+        user = result[0]
+        if self.staff_only and not user.is_staff:
+            return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+        return JsonResponse(await self.build_payload(user))
+
+
+class AsyncUserDashboardView(AsyncDashboardView):
+    build_payload = staticmethod(user_dashboard_payload)
+
+
+class AsyncAdminDashboardView(AsyncDashboardView):
+    staff_only = True
+    build_payload = staticmethod(admin_dashboard_payload)
@@ -0,0 +1,62 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class CachedPayload:
+    """
+    A single response payload kept in the Django cache.
+
+    Entries expire after the number of seconds in `timeout_setting` (the maximum
+    staleness) and are dropped early by `invalidate()` whenever the underlying
+    rows change. Hit and miss counts are kept per process.
+    """
+    def __init__(self, key, timeout_setting, default_timeout):
+        self.key = key
+        self.timeout_setting = timeout_setting
+        self.default_timeout = default_timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, self.timeout_setting, self.default_timeout)
+
+    def get_or_build(self, build):
+        data = cache.get(self.key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if data is None:
+            data = build()
+            cache.set(self.key, data, self.timeout)
+        return data
+
+    async def aget_or_build(self, build):
+        """
+        Like get_or_build, for async callers; `build` is a coroutine function.
+        """
+        data = await cache.aget(self.key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if data is None:
+            data = await build()
+            await cache.aset(self.key, data, self.timeout)
+        return data
+
+    def invalidate(self):
+        cache.delete(self.key)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+admin_dashboard_cache = CachedPayload('products:admin-dashboard', 'ADMIN_DASHBOARD_CACHE_TIMEOUT', 30)
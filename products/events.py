@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EventCursor, RequestStatusCount, ServiceRequest, ServiceRequestEvent, UserRequestSummary
+from .signals import requests_changed
+
+
+def settle_seconds():
+    return getattr(settings, 'EVENT_LOG_SETTLE_SECONDS', 5)
+
+
+def read_events(after=0, limit=1000, settle=0):
+    """
+    Up to `limit` events with an id above `after`, oldest first.
+
+    Ids are handed out at insert time, so a transaction can commit a lower id
+    after a higher one is already visible. Reading stops at a gap in the ids
+    until the event after it is `settle` seconds old; by then the missing id
+    has committed or was rolled back, so a cursor moved past the events
+    returned never skips one. Runs of consecutive ids are returned at once.
+    """
+    events = list(ServiceRequestEvent.objects.filter(id__gt=after).order_by('id')[:limit])
+    cutoff = timezone.now() - timedelta(seconds=settle)
+    expected = after + 1
+    for index, event in enumerate(events):
+        if event.id != expected and event.created_at > cutoff:
+            return events[:index]
+        expected = event.id + 1
+    return events
+
+
+def iter_batches(after=0, batch_size=1000):
+    """
+    Read the whole log after `after` in batches of `batch_size`, without
+    waiting for gaps.
+    """
+    while True:
+        batch = read_events(after, batch_size)
+        if not batch:
+            return
+        yield batch
+        after = batch[-1].id
+
+
+class EventConsumer:
+    """
+    Feeds new events to `handler(events)` in batches and remembers how far it
+    got in an EventCursor row.
+
+    Each batch's handler writes and the cursor move commit together, so a
+    consumer whose handler only writes to this database sees every event
+    exactly once, even across crashes. `settle` (by default
+    EVENT_LOG_SETTLE_SECONDS) is how long a gap in the log is waited for;
+    see read_events().
+    """
+    def __init__(self, name, handler, batch_size=1000, settle=None):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self._settle = settle
+
+    @property
+    def settle(self):
+        return settle_seconds() if self._settle is None else self._settle
+
+    @property
+    def position(self):
+        return EventCursor.objects.filter(name=self.name).values_list('position', flat=True).first() or 0
+
+    def poll(self):
+        """
+        Consume everything available and return the number of events handled.
+        """
+        processed = 0
+        position = self.position
+        # Nothing new is the common case; check without taking the lock.
+        while read_events(position, 1, self.settle):
+            with transaction.atomic():
+                cursor, _ = EventCursor.objects.select_for_update().get_or_create(name=self.name)
+                batch = read_events(cursor.position, self.batch_size, self.settle)
+                if batch:
+                    self.handler(batch)
+                    cursor.position = batch[-1].id
+                    cursor.save(update_fields=['position', 'updated_at'])
+                    processed += len(batch)
+                position = cursor.position
+        return processed
+
+    def reset(self, position=0):
+        EventCursor.objects.update_or_create(name=self.name, defaults={'position': position})
+
+
+def status_count_deltas(events):
+    deltas = {}
+    for event in events:
+        if event.old_status is not None:
+            key = (event.old_status, event.old_payment_status)
+            deltas[key] = deltas.get(key, 0) - 1
+        if event.new_status is not None:
+            key = (event.new_status, event.new_payment_status)
+            deltas[key] = deltas.get(key, 0) + 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_status_counts(events):
+    for (status, payment_status), delta in status_count_deltas(events).items():
+        updated = RequestStatusCount.objects.filter(status=status, payment_status=payment_status).update(
+            count=F('count') + delta
+        )
+        if not updated:
+            RequestStatusCount.objects.create(status=status, payment_status=payment_status, count=delta)
+    requests_changed.send(sender=RequestStatusCount)
+
+
+request_status_counts = EventConsumer('request-status-counts', apply_status_counts)
+
+
+def replay(batch_size=1000):
+    """
+    Fold the whole log, in id order, into the aggregates derived from it.
+
+    Returns `(summaries, status_counts, last_id)`: per-user counters as
+    UserRequestSummary.compute() returns them, per-(status, payment status)
+    counts, and the id of the last event read.
+    """
+    summaries, status_counts, last_id = {}, {}, 0
+    for batch in iter_batches(batch_size=batch_size):
+        for event in batch:
+            counters = summaries.setdefault(event.user_id, [0, 0, 0])
+            if event.old_status is not None:
+                old = ServiceRequest.summary_counts(event.old_status, event.old_payment_status)
+                counters[:] = [value - count for value, count in zip(counters, old)]
+            if event.new_status is not None:
+                new = ServiceRequest.summary_counts(event.new_status, event.new_payment_status)
+                counters[:] = [value + count for value, count in zip(counters, new)]
+        for key, delta in status_count_deltas(batch).items():
+            status_counts[key] = status_counts.get(key, 0) + delta
+        last_id = batch[-1].id
+    summaries = {
+        user_id: dict(zip(UserRequestSummary.COUNTERS, counters))
+        for user_id, counters in summaries.items()
+    }
+    return summaries, {key: count for key, count in status_counts.items() if count}, last_id
+
+
+def rebuild_from_events(batch_size=1000):
+    """
+    Replace UserRequestSummary and RequestStatusCount with a replay of the log.
+    """
+    summaries, status_counts, last_id = replay(batch_size)
+    # The log still holds the history of deleted users.
+    existing = set(get_user_model().objects.filter(pk__in=summaries).values_list('pk', flat=True))
+    summaries = {user_id: counters for user_id, counters in summaries.items() if user_id in existing}
+    with transaction.atomic():
+        UserRequestSummary.rebuild(counts=summaries)
+        RequestStatusCount.objects.all().delete()
+        RequestStatusCount.objects.bulk_create([
+            RequestStatusCount(status=status, payment_status=payment_status, count=count)
+            for (status, payment_status), count in status_counts.items()
+        ])
+        request_status_counts.reset(last_id)
+    return summaries, status_counts
@@ -0,0 +1,57 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Exported columns: (header, values_list lookup).
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user', 'user__username'),
+    ('product', 'product__name'),
+    ('car_repair', 'car_repair__service_name'),
+    ('quantity', 'quantity'),
+    ('status', 'status'),
+    ('payment_status', 'payment_status'),
+    ('total_price', 'total_price'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('notes', 'notes'),
+]
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield one tuple per service request, in EXPORT_COLUMNS order.
+
+    Rows come straight from the database cursor (a server-side cursor on
+    PostgreSQL) in chunks, without building model instances, so memory use
+    does not grow with the number of rows.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    headers = [header for header, _ in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
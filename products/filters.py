@@ -0,0 +1,12 @@
+import django_filters
+
+from .models import ServiceRequest
+
+
+class ServiceRequestExportFilter(django_filters.FilterSet):
+    created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = ServiceRequest
+        fields = ['status', 'payment_status', 'created_after', 'created_before']
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import time
+
+from django.db import transaction
+
+from .models import CarRepair, InventoryMovement, Product
+from .serializers import CarRepairImportSerializer, ProductImportSerializer
+from .signals import stock_changed
+
+# kind -> (model, natural key, row serializer)
+IMPORT_KINDS = {
+    'products': (Product, 'sku', ProductImportSerializer),
+    'services': (CarRepair, 'code', CarRepairImportSerializer),
+}
+
+MAX_REPORTED_REJECTS = 100
+
+
+def read_rows(stream, file_format):
+    """
+    Yield (line number, row dict or None) from a CSV or JSONL text stream.
+
+    Rows that can't be parsed are yielded as None so they can be rejected with
+    their line number.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in (None, '')}
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def guess_format(name):
+    return 'jsonl' if name.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def open_upload(uploaded_file):
+    return io.TextIOWrapper(uploaded_file.file, encoding='utf-8', newline='')
+
+
+class CatalogImporter:
+    """
+    Upsert catalog rows in chunks keyed on the natural key (`sku` for products,
+    `code` for services).
+
+    Each chunk is validated, de-duplicated on its key and written with one
+    INSERT ... ON CONFLICT DO UPDATE in its own transaction, after which
+    `on_chunk(rows_done)` is called so callers can checkpoint. Only columns
+    present in a row are updated on conflict, so a price list without a
+    `stock` column leaves stock alone; a `stock` below what is reserved for
+    service requests is rejected.
+    """
+    def __init__(self, kind, chunk_size=1000):
+        self.model, self.key, self.serializer_class = IMPORT_KINDS[kind]
+        self.chunk_size = chunk_size
+        self.processed = 0
+        self.upserted = 0
+        self.rejected = 0
+        self.rejects = []
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def run(self, rows, skip=0, on_chunk=None):
+        started = time.perf_counter()
+        self.processed = self.skipped = skip
+        chunk = []
+        for index, (line_number, row) in enumerate(rows):
+            if index < skip:
+                continue
+            chunk.append((line_number, row))
+            if len(chunk) == self.chunk_size:
+                self.write_chunk(chunk, on_chunk)
+                chunk = []
+        if chunk:
+            self.write_chunk(chunk, on_chunk)
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def write_chunk(self, chunk, on_chunk):
+        valid, lines = {}, {}
+        for line_number, row in chunk:
+            if row is None:
+                self.reject(line_number, {'row': ['Could not parse row.']})
+                continue
+            serializer = self.serializer_class(data=row)
+            if serializer.is_valid():
+                valid[serializer.validated_data[self.key]] = serializer.validated_data
+                lines[serializer.validated_data[self.key]] = line_number
+            else:
+                self.reject(line_number, serializer.errors)
+
+        with transaction.atomic():
+            stocked = [key for key, data in valid.items() if 'stock' in data] if self.model is Product else []
+            rows = Product.objects.select_for_update().filter(sku__in=stocked).values_list(
+                'sku', 'stock', 'reserved'
+            ) if stocked else []
+            stored = {}
+            for sku, stock, reserved in rows:
+                if valid[sku]['stock'] < reserved:
+                    # Checked under the row lock, so no hold can slip in between.
+                    self.reject(lines[sku], {'stock': [
+                        f"{reserved} items are reserved for service requests; stock can't go below that."
+                    ]})
+                    del valid[sku]
+                else:
+                    stored[sku] = stock
+            stocked = [sku for sku in stocked if sku in valid]
+
+            # Rows with different columns need different ON CONFLICT update lists.
+            groups = {}
+            for data in valid.values():
+                groups.setdefault(tuple(sorted(data)), []).append(self.model(**data))
+            for fields, objs in groups.items():
+                self.model.objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=[self.key],
+                    update_fields=[field for field in fields if field != self.key] + ['updated_at'],
+                )
+            if stocked:
+                self.record_stock_changes(valid, stocked, stored)
+        if valid and self.model is Product:
+            stock_changed.send(sender=Product, pks=None)
+
+        self.upserted += len(valid)
+        self.processed += len(chunk)
+        if on_chunk is not None:
+            on_chunk(self.processed)
+
+    def record_stock_changes(self, valid, skus, stored):
+        """
+        Record the stock levels this chunk set as ledger adjustments.
+        """
+        changed = [sku for sku in skus if valid[sku]['stock'] != stored.get(sku, 0)]
+        if changed:
+            pks = dict(Product.objects.filter(sku__in=changed).values_list('sku', 'pk'))
+            InventoryMovement.record([
+                (pks[sku], 'adjustment', valid[sku]['stock'] - stored.get(sku, 0), 0, None) for sku in changed
+            ])
+
+    def reject(self, line_number, errors):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({'line': line_number, 'errors': errors})
+
+    def report(self):
+        return {
+            'processed': self.processed,
+            'upserted': self.upserted,
+            'rejected': self.rejected,
+            'rejects': self.rejects,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round((self.processed - self.skipped) / self.elapsed, 1) if self.elapsed else None,
+        }
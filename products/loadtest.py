@@ -0,0 +1,179 @@
+import random
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from .middleware import QueryRecorder
+from .models import Product, ServiceRequest
+from .seed import SEED_PREFIX
+
+User = get_user_model()
+
+SEARCH_TERMS = ['part', 'sedan', 'truck', 'van', 'replacement', 'service package']
+
+
+class Fixture:
+    """
+    Ids and tokens of the seeded data set that the scenarios pick from.
+    """
+    def __init__(self):
+        users = list(User.objects.filter(username__startswith=SEED_PREFIX, is_staff=False)
+                     .exclude(username__startswith=f'{SEED_PREFIX}register-')
+                     .values_list('pk', 'username'))
+        tokens = dict(Token.objects.filter(user_id__in=[pk for pk, _ in users]).values_list('user_id', 'key'))
+        missing = [Token(user_id=pk, key=Token.generate_key()) for pk, _ in users if pk not in tokens]
+        Token.objects.bulk_create(missing)
+        tokens.update((token.user_id, token.key) for token in missing)
+        self.users = [(username, tokens[pk]) for pk, username in users]
+
+        admin, _ = User.objects.get_or_create(username=f'{SEED_PREFIX}admin', defaults={'is_staff': True})
+        self.admin_token = Token.objects.get_or_create(user=admin)[0].key
+        self.products = list(Product.objects.filter(name__startswith=SEED_PREFIX, is_active=True)
+                             .values_list('pk', flat=True))
+        self.requests = list(ServiceRequest.objects.filter(user__username__startswith=SEED_PREFIX)
+                             .values_list('pk', flat=True)[:10000])
+        if not (self.users and self.products and self.requests):
+            raise ValueError('No seeded data; run products.seed.seed() first.')
+
+
+def _auth(token):
+    return {'headers': {'Authorization': f'Token {token}'}}
+
+
+# Each scenario maps (fixture, rng) to (method, url, data, client kwargs).
+def register(fixture, rng):
+    username = f'{SEED_PREFIX}register-{uuid.uuid4().hex[:12]}'
+    return 'post', reverse('register'), {
+        'username': username, 'email': f'{username}@example.com', 'password': 'seed-password',
+    }, {}
+
+
+def login(fixture, rng):
+    username, _ = rng.choice(fixture.users)
+    return 'post', reverse('login'), {'username': username, 'password': 'seed-password'}, {}
+
+
+def product_list(fixture, rng):
+    return 'get', reverse('product-list-create'), None, _auth(rng.choice(fixture.users)[1])
+
+
+def product_search(fixture, rng):
+    url = f'{reverse("product-list-create")}?search={rng.choice(SEARCH_TERMS)}'
+    return 'get', url, None, _auth(rng.choice(fixture.users)[1])
+
+
+def service_list(fixture, rng):
+    return 'get', reverse('service-list-create'), None, _auth(rng.choice(fixture.users)[1])
+
+
+def sell(fixture, rng):
+    url = reverse('product-sell', args=[rng.choice(fixture.products)])
+    return 'patch', url, {'quantity': 1}, _auth(rng.choice(fixture.users)[1])
+
+
+def buy(fixture, rng):
+    url = reverse('product-buy', args=[rng.choice(fixture.products)])
+    return 'patch', url, {'quantity': 1}, _auth(rng.choice(fixture.users)[1])
+
+
+def request_create(fixture, rng):
+    return 'post', reverse('request-list-create'), {
+        'quantity': rng.randint(1, 4), 'notes': 'load test',
+    }, _auth(rng.choice(fixture.users)[1])
+
+
+def request_list(fixture, rng):
+    return 'get', reverse('request-list-create'), None, _auth(rng.choice(fixture.users)[1])
+
+
+def request_update_status(fixture, rng):
+    # Payment status has no transition rules, so every update is legal.
+    url = reverse('request-update-status', args=[rng.choice(fixture.requests)])
+    payment_status = rng.choice([choice for choice, _ in ServiceRequest.PAYMENT_STATUS])
+    return 'patch', url, {'payment_status': payment_status}, _auth(fixture.admin_token)
+
+
+def user_dashboard(fixture, rng):
+    return 'get', reverse('user-dashboard'), None, _auth(rng.choice(fixture.users)[1])
+
+
+def admin_dashboard(fixture, rng):
+    return 'get', reverse('admin-dashboard'), None, _auth(fixture.admin_token)
+
+
+SCENARIOS = {
+    scenario.__name__: scenario
+    for scenario in [
+        register, login, product_list, product_search, service_list, sell, buy,
+        request_create, request_list, request_update_status, user_dashboard, admin_dashboard,
+    ]
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_scenario(name, fixture, requests, concurrency, seed=0):
+    """
+    Send `requests` requests of scenario `name` from `concurrency` threads and
+    return throughput, latency percentiles (ms), queries per request and
+    status code counts.
+
+    Each worker draws from its own seeded RNG, so a run picks the same users,
+    products and requests every time.
+    """
+    scenario = SCENARIOS[name]
+
+    def worker(index, count):
+        rng = random.Random(f'{seed}-{name}-{index}')
+        client = Client()
+        samples = []
+        try:
+            for _ in range(count):
+                method, url, data, kwargs = scenario(fixture, rng)
+                recorder = QueryRecorder()
+                started = time.perf_counter()
+                with connection.execute_wrapper(recorder):
+                    if data is None:
+                        response = getattr(client, method)(url, **kwargs)
+                    else:
+                        response = getattr(client, method)(url, data, content_type='application/json', **kwargs)
+                samples.append((time.perf_counter() - started, recorder.count, response.status_code))
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+        return samples
+
+    counts = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    if concurrency == 1:
+        results = [worker(0, requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, range(concurrency), counts))
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for result in results for sample in result]
+    latencies = sorted(latency for latency, _, _ in samples)
+    statuses = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(samples) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(sum(queries for _, queries, _ in samples) / len(samples), 2),
+        'status_codes': dict(sorted(statuses.items())),
+    }
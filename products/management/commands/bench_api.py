@@ -0,0 +1,96 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from products.loadtest import SCENARIOS, Fixture, run_scenario
+from products.seed import seed, unseed
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a data set, drive every API endpoint at the given concurrency levels and write '
+        'throughput, p50/p95/p99 latency and queries per request to a JSON file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='bench_api.json')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and concurrency level.')
+        parser.add_argument('--concurrency', default='1,8')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated subset to run.')
+        parser.add_argument('--seed-users', type=int, default=100)
+        parser.add_argument('--seed-products', type=int, default=1000)
+        parser.add_argument('--seed-services', type=int, default=100)
+        parser.add_argument('--seed-requests', type=int, default=10000)
+        parser.add_argument('--rng-seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help='Leave the seeded data in place afterwards.')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        sizes = {
+            'users': options['seed_users'],
+            'products': options['seed_products'],
+            'services': options['seed_services'],
+            'requests': options['seed_requests'],
+        }
+
+        unseed()
+        self.stdout.write(f'Seeding {sizes}...')
+        seed(**sizes)
+        try:
+            fixture = Fixture()
+            results = {}
+            # Login is slow by design; keep the slow-request log out of the output.
+            hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+            with override_settings(ALLOWED_HOSTS=hosts, SLOW_REQUEST_THRESHOLD=float('inf')):
+                self.stdout.write(f'{"scenario":<24}{"conc":>5}{"req/s":>9}{"p50 ms":>9}'
+                                  f'{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}')
+                for name in scenarios:
+                    results[name] = {}
+                    for level in levels:
+                        result = run_scenario(name, fixture, options['requests'], level, seed=options['rng_seed'])
+                        results[name][str(level)] = result
+                        self.stdout.write(
+                            f'{name:<24}{level:>5}{result["throughput"]:>9.1f}{result["p50_ms"]:>9.2f}'
+                            f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}{result["queries_per_request"]:>9.2f}'
+                        )
+        finally:
+            if not options['keep']:
+                unseed()
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'date': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'seed': sizes,
+                'requests': options['requests'],
+                'rng_seed': options['rng_seed'],
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
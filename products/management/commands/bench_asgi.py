@@ -0,0 +1,90 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from products.seed import seed, unseed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare latency and requests/sec of the sync (WSGI) and async (ASGI) admin dashboard '
+        'at increasing concurrency, driving both handlers in-process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per concurrency level.')
+        parser.add_argument('--concurrency', default='1,4,16,32')
+        parser.add_argument('--seed', type=int, default=0, help='Seed this many service requests first.')
+        parser.add_argument('--cached', action='store_true', help='Leave the dashboard cache on.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed(requests=options['seed'])
+        user = User.objects.create_user(username='bench-asgi', password=None, is_staff=True)
+        headers = {'Authorization': f'Token {Token.objects.create(user=user).key}'}
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['cached']:
+            overrides['ADMIN_DASHBOARD_CACHE_TIMEOUT'] = 0
+        try:
+            with override_settings(**overrides):
+                self.stdout.write(f'{"path":<8}{"conc":>6}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}')
+                for level in levels:
+                    self.report('wsgi', level, *self.run_sync(reverse('admin-dashboard'), headers, level, options['requests']))
+                    self.report('asgi', level, *asyncio.run(
+                        self.run_async(reverse('admin-dashboard-async'), headers, level, options['requests'])
+                    ))
+        finally:
+            user.delete()
+            if options['seed']:
+                unseed()
+
+    def run_sync(self, url, headers, concurrency, total):
+        def worker(count):
+            client = Client()
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, self.split(total, concurrency)))
+        return [latency for latencies in results for latency in latencies], time.perf_counter() - started
+
+    async def run_async(self, url, headers, concurrency, total):
+        async def worker(count):
+            client = AsyncClient()
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[worker(count) for count in self.split(total, concurrency)])
+        return [latency for latencies in results for latency in latencies], time.perf_counter() - started
+
+    def split(self, total, parts):
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+    def report(self, path, concurrency, latencies, elapsed):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{path:<8}{concurrency:>6}{len(latencies) / elapsed:>10.1f}'
+            f'{statistics.median(latencies) * 1000:>10.2f}{p95 * 1000:>10.2f}'
+        )
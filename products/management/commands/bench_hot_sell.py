@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import InventoryMovement, Product, StockSnapshot
+
+
+def sell_row_only(product):
+    # Product.sell() as it was before the ledger: the guarded UPDATE alone.
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product.pk, stock__gte=F('reserved') + 1).update(
+            stock=F('stock') - 1, updated_at=timezone.now()
+        )
+        return Product.objects.values_list('stock', flat=True).get(pk=product.pk) if updated else None
+
+
+def sell(product):
+    return product.sell(1)
+
+
+def append_only(product):
+    # The ledger insert on its own: what a sale costs without the oversell check.
+    InventoryMovement.record([(product.pk, 'sale', -1, 0, None)])
+
+
+MODES = {
+    'row': sell_row_only,
+    'sell': sell,
+    'append': append_only,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Sell one unit at a time of a single hot product from many threads and report throughput '
+        'and latency for: the guarded UPDATE alone (Product.sell before the ledger), Product.sell() '
+        'with its ledger insert, and a bare ledger insert with no oversell check.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode.')
+        parser.add_argument('--modes', default=','.join(MODES))
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(name='bench-hot-sell', description='', price=1, stock=10 ** 9)
+        try:
+            self.stdout.write(f'{"mode":<8}{"threads":>8}{"sells/s":>10}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}')
+            for mode in options['modes'].split(','):
+                latencies, errors = self.run(MODES[mode], product, options['threads'], options['duration'])
+                latencies.sort()
+                p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else 0
+                self.stdout.write(
+                    f'{mode:<8}{options["threads"]:>8}{len(latencies) / options["duration"]:>10.1f}'
+                    f'{(statistics.median(latencies) if latencies else 0) * 1000:>9.2f}{p95 * 1000:>9.2f}{errors:>8}'
+                )
+        finally:
+            InventoryMovement.objects.filter(product_id=product.pk).delete()
+            StockSnapshot.objects.filter(product_id=product.pk).delete()
+            product.delete()
+
+    def run(self, func, product, threads, duration):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            mine, failed = [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        func(product)
+                    except DatabaseError:
+                        failed += 1
+                        continue
+                    mine.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(mine)
+                errors[0] += failed
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return latencies, errors[0]
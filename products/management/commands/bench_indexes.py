@@ -0,0 +1,109 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from products.models import CarRepair, Product, ServiceRequest
+from products.seed import seed, unseed
+
+# Indexes added for the API's filter paths; dropped temporarily for the
+# "before" measurements.
+BENCH_INDEXES = {
+    Product: ['product_active_idx', 'product_low_stock_idx'],
+    CarRepair: ['carrepair_active_created_idx'],
+    ServiceRequest: [
+        'request_created_id_idx',
+        'request_price_id_idx',
+        'request_user_created_id_idx',
+        'request_user_price_id_idx',
+        'request_status_created_idx',
+        'request_payment_created_idx',
+        'request_user_status_idx',
+        'request_user_payment_idx',
+    ],
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seed a large data set and print EXPLAIN plans and timings for the API queries with and without indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200000)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--no-seed', action='store_true', help='Use the seeded data already in the database.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data afterwards.')
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            self.stdout.write('Seeding...')
+            seed(users=500, products=options['products'], services=500, requests=options['requests'])
+        try:
+            self.analyze()
+            user = ServiceRequest.objects.filter(user__username__startswith='seed-').values_list('user', flat=True)[0]
+            queries = self.get_queries(user)
+            after = self.measure(queries, options['repeat'])
+            try:
+                with transaction.atomic():
+                    self.drop_indexes()
+                    self.analyze()
+                    before = self.measure(queries, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+            self.stdout.write('')
+            self.stdout.write(f'{"query":<32}{"before ms":>12}{"after ms":>12}')
+            for name in queries:
+                self.stdout.write(f'{name:<32}{before[name][0]:>12.2f}{after[name][0]:>12.2f}')
+            for name in queries:
+                self.stdout.write(f'\n== {name}\n-- before\n{before[name][1]}\n-- after\n{after[name][1]}')
+        finally:
+            if not options['keep']:
+                unseed()
+
+    def get_queries(self, user):
+        requests = ServiceRequest.objects.with_related().order_by('-created_at', '-id')
+        return {
+            'request list': requests,
+            'request list ?status': requests.filter(status='pending'),
+            'request list ?payment_status': requests.filter(payment_status='unpaid'),
+            'request list by price': requests.order_by('-total_price', '-id'),
+            'user request list': requests.filter(user=user),
+            'user request list by price': requests.filter(user=user).order_by('-total_price', '-id'),
+            'user request list ?status': requests.filter(user=user, status='in_progress'),
+            'user request list ?payment': requests.filter(user=user, payment_status='unpaid'),
+            'user summary rebuild': ServiceRequest.objects.filter(user=user).values('user').annotate(
+                completed=Count('id', filter=Q(status='completed'))
+            ),
+            'low stock products': Product.objects.filter(stock__lt=5, is_active=True),
+            'product list': Product.objects.filter(is_active=True).order_by('-id'),
+            'service list': CarRepair.objects.filter(is_active=True).order_by('-created_at', '-id'),
+        }
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset[:50])
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), queryset[:50].explain())
+        return results
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for names in BENCH_INDEXES.values():
+                for name in names:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,81 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from products.parsers import FastJSONParser
+from products.renderers import FastJSONRenderer
+from products.seed import seed, unseed
+from products.views import ProductListCreateAPIView, ServiceRequestListCreateAPIView
+
+User = get_user_model()
+
+PAIRS = [
+    ('drf', JSONRenderer, JSONParser),
+    ('fast', FastJSONRenderer, FastJSONParser),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the default DRF JSON renderer/parser with FastJSONRenderer/FastJSONParser on '
+        'product and request list pages: encode and decode time, and bytes on the wire with '
+        'and without gzip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', action='store_true', help='Seed a data set first and remove it afterwards.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed(users=20, products=options['rows'], services=20, requests=options['rows'])
+        user = User.objects.create_user(username='bench-json', password=None, is_staff=True)
+        try:
+            pages = {
+                'products': self.page(ProductListCreateAPIView, user, options['rows']),
+                'requests': self.page(ServiceRequestListCreateAPIView, user, options['rows']),
+            }
+        finally:
+            user.delete()
+            if options['seed']:
+                unseed()
+
+        self.stdout.write(f'{"page":<10}{"codec":<6}{"rows":>6}{"encode ms":>11}{"decode ms":>11}'
+                          f'{"bytes":>10}{"gzip bytes":>12}{"gzip ms":>9}')
+        for label, data in pages.items():
+            for codec, renderer_class, parser_class in PAIRS:
+                renderer, parser = renderer_class(), parser_class()
+                body = renderer.render(data)
+                encode = self.median(lambda: renderer.render(data), options['repeat'])
+                decode = self.median(lambda: parser.parse(BytesIO(body)), options['repeat'])
+                gzipped = self.median(lambda: compress_string(body), options['repeat'])
+                self.stdout.write(
+                    f'{label:<10}{codec:<6}{len(data):>6}{encode * 1000:>11.3f}{decode * 1000:>11.3f}'
+                    f'{len(body):>10}{len(compress_string(body)):>12}{gzipped * 1000:>9.3f}'
+                )
+
+    def page(self, view_class, user, rows):
+        request = APIRequestFactory().get('/')
+        view = view_class()
+        view.setup(request)
+        view.format_kwarg = None
+        view.request = view.initialize_request(request)
+        view.request.user = user
+        objects = list(view.filter_queryset(view.get_queryset())[:rows])
+        return view.get_serializer(objects, many=True).data
+
+    def median(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
@@ -0,0 +1,46 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of MetricsMiddleware on the product list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='bench-metrics', password=None)
+        headers = {'Authorization': f'Token {Token.objects.create(user=user).key}'}
+        url = reverse('product-list-create')
+        without = [name for name in settings.MIDDLEWARE if name != 'products.middleware.MetricsMiddleware']
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        try:
+            results = {}
+            # Alternate the two configurations to spread out noise.
+            for _ in range(3):
+                for label, middleware in [('without', without), ('with', settings.MIDDLEWARE)]:
+                    with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=hosts):
+                        client = Client()
+                        client.get(url, headers=headers)
+                        timings = []
+                        for _ in range(options['requests']):
+                            started = time.perf_counter()
+                            client.get(url, headers=headers)
+                            timings.append(time.perf_counter() - started)
+                    results.setdefault(label, []).extend(timings)
+            base = statistics.median(results['without'])
+            instrumented = statistics.median(results['with'])
+            self.stdout.write(f'without middleware: {base * 1e6:.0f} us/request (median)')
+            self.stdout.write(f'with middleware:    {instrumented * 1e6:.0f} us/request (median)')
+            self.stdout.write(f'overhead:           {(instrumented - base) * 1e6:.0f} us ({(instrumented / base - 1) * 100:.1f}%)')
+        finally:
+            user.delete()
@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent sells at a single product and report oversell and throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sells', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--stock', type=int, default=200)
+
+    def handle(self, *args, **options):
+        sells = options['sells']
+        product = Product.objects.create(
+            name='bench-sell', description='', price=1, stock=options['stock'], is_active=False
+        )
+
+        def sell(_):
+            try:
+                return Product(pk=product.pk).sell(1) is not None
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                succeeded = sum(pool.map(sell, range(sells)))
+            elapsed = time.perf_counter() - started
+
+            product.refresh_from_db()
+            sold = options['stock'] - product.stock
+            self.stdout.write(f'attempted: {sells}')
+            self.stdout.write(f'succeeded: {succeeded}')
+            self.stdout.write(f'final stock: {product.stock}')
+            self.stdout.write(f'throughput: {sells / elapsed:.1f} sells/sec')
+            if sold != succeeded or product.stock < 0:
+                self.stderr.write(self.style.ERROR('Oversell detected'))
+            else:
+                self.stdout.write(self.style.SUCCESS('No oversell'))
+        finally:
+            product.delete()
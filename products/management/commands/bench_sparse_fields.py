@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from products.seed import seed, unseed
+from products.views import ProductListCreateAPIView, ServiceRequestListCreateAPIView
+
+User = get_user_model()
+
+CASES = [
+    ('products', ProductListCreateAPIView, '/api/products/', [None, 'id,name,price,stock']),
+    ('requests', ServiceRequestListCreateAPIView, '/api/requests/', [None, 'id,status,total_price,created_at']),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare full and ?fields= sparse list responses: payload bytes per row and '
+        'query and serialization time per row.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per measured page.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', action='store_true', help='Seed a data set first and remove it afterwards.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed(users=20, products=options['rows'], services=20, requests=options['rows'])
+        user = User.objects.create_user(username='bench-sparse-fields', password=None, is_staff=True)
+        try:
+            self.stdout.write(f'{"endpoint":<10}{"fields":<36}{"rows":>6}{"bytes/row":>11}'
+                              f'{"query us/row":>14}{"serialize us/row":>18}')
+            for label, view_class, path, variants in CASES:
+                for fields in variants:
+                    rows, size, query, serialize = self.measure(
+                        view_class, path, fields, user, options['rows'], options['repeat']
+                    )
+                    per_row = max(rows, 1)
+                    self.stdout.write(
+                        f'{label:<10}{fields or "(all)":<36}{rows:>6}{size / per_row:>11.1f}'
+                        f'{query / per_row * 1e6:>14.1f}{serialize / per_row * 1e6:>18.1f}'
+                    )
+        finally:
+            user.delete()
+            if options['seed']:
+                unseed()
+
+    def measure(self, view_class, path, fields, user, rows, repeat):
+        request = APIRequestFactory().get(path, {'fields': fields} if fields else {})
+        view = view_class()
+        view.setup(request)
+        view.format_kwarg = None
+        view.request = view.initialize_request(request)
+        view.request.user = user
+        renderer = JSONRenderer()
+
+        query_times, serialize_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            objects = list(view.filter_queryset(view.get_queryset())[:rows])
+            query_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            body = renderer.render(view.get_serializer(objects, many=True).data)
+            serialize_times.append(time.perf_counter() - started)
+        return len(objects), len(body), statistics.median(query_times), statistics.median(serialize_times)
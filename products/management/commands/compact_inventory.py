@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.ledger import compact, verify
+
+
+class Command(BaseCommand):
+    help = (
+        'Roll inventory ledger movements into per-product stock snapshots, or check with --verify '
+        'that the ledger adds up to the stock and reserved counters on Product.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Compare the ledger with the product table.')
+        parser.add_argument('--settle', type=float, default=60, help='Leave movements younger than this many seconds.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            written = compact(settle=options['settle'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} stock snapshots'))
+            return
+
+        mismatches = verify()
+        for pk, (ledger, table) in sorted(mismatches.items()):
+            self.stdout.write(f'product {pk}: ledger has (stock, reserved) {ledger}, table has {table}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} products differ between the ledger and the product table')
+        self.stdout.write(self.style.SUCCESS('Inventory ledger matches the product table'))
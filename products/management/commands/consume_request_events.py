@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.events import request_status_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Catch the admin dashboard status counts up with the service request event log. '
+        'Runs once, or every --interval seconds until interrupted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep consuming, this many seconds apart.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = request_status_counts.poll()
+            self.stdout.write(f'Consumed {processed} events')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
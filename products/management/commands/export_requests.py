@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.export import EXPORT_FORMATS, export_rows
+from products.filters import ServiceRequestExportFilter
+from products.models import ServiceRequest
+
+
+class Command(BaseCommand):
+    help = 'Stream service requests to CSV or NDJSON with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write to; defaults to stdout.')
+        parser.add_argument('--status')
+        parser.add_argument('--payment-status')
+        parser.add_argument('--created-after', help='ISO date or datetime, inclusive.')
+        parser.add_argument('--created-before', help='ISO date or datetime, exclusive.')
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name]
+            for name in ['status', 'payment_status', 'created_after', 'created_before']
+            if options[name]
+        }
+        filterset = ServiceRequestExportFilter(params, queryset=ServiceRequest.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        chunks = EXPORT_FORMATS[options['format']](export_rows(filterset.qs))
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(chunks)
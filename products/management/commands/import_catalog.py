@@ -0,0 +1,45 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from products.importer import IMPORT_KINDS, CatalogImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert products or car-repair services from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=IMPORT_KINDS, default='products')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help='Checkpoint file; defaults to <path>.checkpoint.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        skip = 0
+        if os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint) as f:
+                skip = json.load(f)['processed']
+            self.stdout.write(f'Resuming after row {skip}')
+
+        def save_checkpoint(processed):
+            with open(checkpoint, 'w') as f:
+                json.dump({'processed': processed}, f)
+
+        importer = CatalogImporter(options['kind'], chunk_size=options['chunk_size'])
+        with open(path, newline='', encoding='utf-8') as stream:
+            rows = read_rows(stream, options['format'] or guess_format(path))
+            report = importer.run(rows, skip=skip, on_chunk=save_checkpoint)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        for reject in report['rejects']:
+            self.stderr.write(f'line {reject["line"]}: {json.dumps(reject["errors"])}')
+        self.stdout.write(
+            f'{report["processed"]} rows processed, {report["upserted"]} upserted, '
+            f'{report["rejected"]} rejected in {report["seconds"]}s ({report["rows_per_second"]} rows/sec)'
+        )
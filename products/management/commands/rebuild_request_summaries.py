@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import UserRequestSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user dashboard counters from ServiceRequest, or verify them with --verify.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Report mismatches without writing.')
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            counts = UserRequestSummary.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {len(counts)} users'))
+            return
+
+        expected = UserRequestSummary.compute()
+        stored = {
+            row.pop('user_id'): row
+            for row in UserRequestSummary.objects.values('user_id', *UserRequestSummary.COUNTERS)
+        }
+        zero = dict.fromkeys(UserRequestSummary.COUNTERS, 0)
+        mismatches = 0
+        for user_id in expected.keys() | stored.keys():
+            # Users without a row are rebuilt lazily, so only stale rows count.
+            if user_id not in stored:
+                continue
+            if stored[user_id] != expected.get(user_id, zero):
+                mismatches += 1
+                self.stdout.write(f'user {user_id}: stored {stored[user_id]}, expected {expected.get(user_id, zero)}')
+        if mismatches:
+            raise CommandError(f'{mismatches} summaries are out of date; run without --verify to rebuild')
+        self.stdout.write(self.style.SUCCESS(f'{len(stored)} summaries verified'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.models import StockReservation
+
+
+class Command(BaseCommand):
+    help = (
+        'Give back the stock held by pending service requests whose reservation has expired. '
+        'Runs once, or every --interval seconds until interrupted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds released per transaction.')
+        parser.add_argument('--interval', type=float, help='Keep sweeping, this many seconds apart.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = StockReservation.release_expired(batch_size=options['batch_size'])
+            self.stdout.write(f'Released {released} expired reservations')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
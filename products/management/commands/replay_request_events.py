@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from products.events import rebuild_from_events, replay
+from products.models import ServiceRequest, UserRequestSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay the service request event log to rebuild the aggregates derived from it '
+        '(user request summaries and admin dashboard status counts), or check it with --verify.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Compare the replay with the request table.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            summaries, status_counts = rebuild_from_events(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {len(summaries)} user summaries and {len(status_counts)} status counts from the event log'
+            ))
+            return
+
+        summaries, status_counts, last_id = replay(options['batch_size'])
+        mismatches = 0
+        zero = dict.fromkeys(UserRequestSummary.COUNTERS, 0)
+        expected = UserRequestSummary.compute()
+        for user_id in sorted(expected.keys() | summaries.keys()):
+            replayed, counted = summaries.get(user_id, zero), expected.get(user_id, zero)
+            if replayed != counted:
+                mismatches += 1
+                self.stdout.write(f'user {user_id}: replayed {replayed}, table has {counted}')
+        counted = {
+            (row['status'], row['payment_status']): row['count']
+            for row in ServiceRequest.objects.order_by().values('status', 'payment_status').annotate(count=Count('id'))
+        }
+        for key in sorted(counted.keys() | status_counts.keys()):
+            if status_counts.get(key, 0) != counted.get(key, 0):
+                mismatches += 1
+                self.stdout.write(f'{key}: replayed {status_counts.get(key, 0)}, table has {counted.get(key, 0)}')
+        if mismatches:
+            raise CommandError(f'{mismatches} aggregates differ between the event log and the request table')
+        self.stdout.write(self.style.SUCCESS(f'Event log up to #{last_id} matches the request table'))
@@ -0,0 +1,122 @@
+import threading
+from bisect import bisect_left
+
+from users.authentication import token_cache
+from users.hashing import password_hash_pool
+
+from .cache import admin_dashboard_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics keyed by (URL name, method, status class).
+
+    Each worker process keeps its own registry, so scrape every worker (or
+    sum across them) when running more than one.
+    """
+    def __init__(self):
+        self._views = {}
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, method, status, seconds, size, db_queries, db_seconds, render_seconds, db_aliases=None):
+        key = (view, method, f'{status // 100}xx')
+        with self._lock:
+            metrics = self._views.get(key)
+            if metrics is None:
+                metrics = self._views[key] = ViewMetrics()
+            metrics.latency.observe(seconds)
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.db_queries += db_queries
+            metrics.db_seconds += db_seconds
+            metrics.render_seconds += render_seconds
+            for alias, (queries, alias_seconds) in (db_aliases or {}).items():
+                totals = self._databases.setdefault(alias, [0, 0.0])
+                totals[0] += queries
+                totals[1] += alias_seconds
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._databases.clear()
+
+    def render(self):
+        """
+        The registry in Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+            for name, kind, help_text, get in [
+                ('http_request_duration_seconds', 'histogram', 'Request latency.', lambda m: m.latency),
+                ('http_response_size_bytes', 'histogram', 'Response body size.', lambda m: m.response_size),
+                ('http_request_db_queries_total', 'counter', 'Database queries run.', lambda m: m.db_queries),
+                ('http_request_db_seconds_total', 'counter', 'Time spent in the database.', lambda m: m.db_seconds),
+                ('http_request_render_seconds_total', 'counter', 'Time spent rendering responses.',
+                 lambda m: m.render_seconds),
+            ]:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (view, method, status), metrics in views:
+                    labels = f'view="{view}",method="{method}",status="{status}"'
+                    value = get(metrics)
+                    if isinstance(value, Histogram):
+                        lines += value.lines(name, labels)
+                    else:
+                        lines.append(f'{name}{{{labels}}} {value}')
+            databases = sorted(self._databases.items())
+            for name, help_text, index in [
+                ('db_queries_total', 'Database queries run, per database alias.', 0),
+                ('db_query_seconds_total', 'Time spent in the database, per database alias.', 1),
+            ]:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                lines += [f'{name}{{database="{alias}"}} {totals[index]}' for alias, totals in databases]
+
+        caches = [('token', token_cache.stats()), ('admin_dashboard', admin_dashboard_cache.stats())]
+        for result, help_text in [('hits', 'Cache lookups answered from the cache.'),
+                                  ('misses', 'Cache lookups that had to be built or fetched.')]:
+            name = f'cache_{result}_total'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{cache="{cache_name}"}} {stats[result]}' for cache_name, stats in caches]
+        pool = password_hash_pool.stats()
+        for result, help_text in [('completed', 'Password hashing jobs run.'),
+                                  ('rejected', 'Password hashing jobs turned away with the pool full.')]:
+            name = f'password_hash_{result}_total'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter', f'{name} {pool[result]}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
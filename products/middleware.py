@@ -0,0 +1,153 @@
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import registry
+from .routers import replica_aliases, route_request
+
+slow_request_logger = logging.getLogger('products.slow_requests')
+
+# Statements kept per request for the slow-request log.
+MAX_LOGGED_QUERIES = 50
+
+# The recorder of the request being served, for queries it runs on other
+# threads (see async_views.run_in_thread).
+current_query_recorder = ContextVar('current_query_recorder', default=None)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting and timing every query of a request,
+    from whichever thread runs it.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+        self.by_alias = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.seconds += elapsed
+                alias = self.by_alias.setdefault(context['connection'].alias, [0, 0.0])
+                alias[0] += 1
+                alias[1] += elapsed
+                if len(self.statements) < MAX_LOGGED_QUERIES:
+                    self.statements.append((elapsed, sql))
+
+
+class MetricsMiddleware:
+    """
+    Record latency, DB queries and time, render time and response size per URL
+    name into products.metrics.registry, and log requests slower than
+    SLOW_REQUEST_THRESHOLD seconds together with their SQL.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._metrics_render_seconds = 0.0
+        started = time.perf_counter()
+        token = current_query_recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            current_query_recorder.reset(token)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        registry.record(
+            view, request.method, response.status_code, elapsed, size,
+            recorder.count, recorder.seconds, request._metrics_render_seconds, recorder.by_alias,
+        )
+
+        if elapsed > getattr(settings, 'SLOW_REQUEST_THRESHOLD', 1.0):
+            slow_request_logger.warning(
+                'Slow request %s %s (%s): %.3fs, %d queries in %.3fs\n%s',
+                request.method, request.get_full_path(), view, elapsed, recorder.count, recorder.seconds,
+                '\n'.join(f'  {seconds * 1000:.1f}ms {sql}' for seconds, sql in recorder.statements),
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns.
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render_seconds += time.perf_counter() - started
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware for clients sending `Accept-Encoding: gzip`, leaving
+    responses shorter than GZIP_MIN_LENGTH bytes uncompressed: on small
+    bodies the CPU cost outweighs the few bytes saved.
+    """
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < getattr(settings, 'GZIP_MIN_LENGTH', 1024):
+            return response
+        return super().process_response(request, response)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of GET/HEAD/OPTIONS requests to one of REPLICA_DATABASES
+    (see products.routers.ReplicaRouter).
+
+    A client that wrote within the last REPLICA_STICKY_SECONDS reads from
+    the primary so it sees its own changes despite replication lag. The
+    write is remembered in a signed cookie rather than a server-side cache,
+    so it holds whichever process or server the next request lands on. Only
+    unsafe requests set it: a write made while serving a GET is bookkeeping,
+    not a change the client is waiting to read back.
+    """
+    cookie_name = 'replica_sticky'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = replica_aliases()
+        if not replicas:
+            return self.get_response(request)
+        sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        replica = None
+        if request.method in SAFE_METHODS and not self.wrote_recently(request, sticky_seconds):
+            replica = random.choice(replicas)
+        with route_request(replica) as routing:
+            response = self.get_response(request)
+        if routing.wrote and request.method not in SAFE_METHODS:
+            response.set_signed_cookie(
+                self.cookie_name, '1', salt=self.cookie_name, max_age=sticky_seconds,
+                secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
+
+    def wrote_recently(self, request, sticky_seconds):
+        # The signature's timestamp is when the client wrote.
+        return request.get_signed_cookie(
+            self.cookie_name, default=None, salt=self.cookie_name, max_age=sticky_seconds
+        ) is not None
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_servicerequest_options_carrepair_is_active_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRequestSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='request_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('active_requests', models.PositiveIntegerField(default=0)),
+                ('completed_requests', models.PositiveIntegerField(default=0)),
+                ('pending_payments', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_userrequestsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carrepair',
+            index=models.Index(fields=['created_at', 'id'], name='carrepair_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['created_at', 'id'], name='request_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['total_price', 'id'], name='request_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='request_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['user', 'total_price', 'id'], name='request_user_price_id_idx'),
+        ),
+    ]
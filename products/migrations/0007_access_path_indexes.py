@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='carrepair',
+            name='carrepair_created_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='carrepair',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='carrepair_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='product_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock__lt', 5)), fields=['stock'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='request_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['payment_status', 'created_at', 'id'], name='request_payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['user', 'status', 'created_at', 'id'], name='request_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['user', 'payment_status', 'created_at', 'id'], name='request_user_payment_idx'),
+        ),
+    ]
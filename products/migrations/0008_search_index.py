@@ -0,0 +1,102 @@
+from django.db import migrations
+
+# Table -> indexed columns, highest weight first. Mirrors
+# products.search.SEARCH_INDEXES at the time of this migration.
+SEARCH_INDEXES = {
+    'products_product': ('name', 'description'),
+    'products_carrepair': ('service_name', 'description'),
+}
+WEIGHTS = 'ABCD'
+
+
+def postgresql_sql(table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('english', coalesce(NEW.{column}, '')), '{weight}')"
+        for column, weight in zip(columns, WEIGHTS)
+    )
+    return [
+        f'ALTER TABLE {table} ADD COLUMN search_vector tsvector',
+        f'''CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql''',
+        # Only text edits recompute the vector, so stock updates stay cheap.
+        f'''CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {', '.join(columns)}
+            ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()''',
+        f'UPDATE {table} SET {columns[0]} = {columns[0]}',
+        f'CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)',
+    ]
+
+
+def postgresql_reverse_sql(table, columns):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_search_vector ON {table}',
+        f'DROP FUNCTION IF EXISTS {table}_search_vector()',
+        f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector',
+    ]
+
+
+def sqlite_sql(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id', "
+        f"tokenize='porter unicode61')",
+        f'''CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+            END''',
+        f'''CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+            END''',
+        f'''CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+            END''',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sqlite_reverse_sql(table, columns):
+    fts = f'{table}_fts'
+    return [
+        f'DROP TRIGGER IF EXISTS {fts}_ai',
+        f'DROP TRIGGER IF EXISTS {fts}_ad',
+        f'DROP TRIGGER IF EXISTS {fts}_au',
+        f'DROP TABLE IF EXISTS {fts}',
+    ]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def run(builders):
+    def operation(apps, schema_editor):
+        connection = schema_editor.connection
+        builder = builders.get(connection.vendor)
+        if builder is None or (connection.vendor == 'sqlite' and not sqlite_has_fts5(connection)):
+            return
+        for table, columns in SEARCH_INDEXES.items():
+            for sql in builder(table, columns):
+                schema_editor.execute(sql, params=None)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': postgresql_sql, 'sqlite': sqlite_sql}),
+            run({'postgresql': postgresql_reverse_sql, 'sqlite': sqlite_reverse_sql}),
+        ),
+    ]
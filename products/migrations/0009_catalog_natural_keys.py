@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrepair',
+            name='code',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
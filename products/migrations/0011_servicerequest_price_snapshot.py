@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:42
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_current_prices(apps, schema_editor):
+    # Existing totals were computed from the live catalog prices, so those are
+    # the best snapshot available.
+    ServiceRequest = apps.get_model('products', 'ServiceRequest')
+    Product = apps.get_model('products', 'Product')
+    CarRepair = apps.get_model('products', 'CarRepair')
+    ServiceRequest.objects.filter(product__isnull=False).update(
+        product_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    )
+    ServiceRequest.objects.filter(car_repair__isnull=False).update(
+        car_repair_price=Subquery(CarRepair.objects.filter(pk=OuterRef('car_repair_id')).values('price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='car_repair_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='product_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_current_prices, migrations.RunPython.noop),
+    ]
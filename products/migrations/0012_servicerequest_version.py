@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_servicerequest_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_created_events(apps, schema_editor):
+    # Start the log with each existing request's current state so replaying
+    # it reproduces today's aggregates.
+    ServiceRequest = apps.get_model('products', 'ServiceRequest')
+    ServiceRequestEvent = apps.get_model('products', 'ServiceRequestEvent')
+    rows = ServiceRequest.objects.order_by('id').values_list('id', 'user_id', 'status', 'payment_status', 'created_at')
+    batch = []
+    for request_id, user_id, status, payment_status, created_at in rows.iterator(chunk_size=5000):
+        batch.append(ServiceRequestEvent(
+            request_id=request_id, user_id=user_id,
+            new_status=status, new_payment_status=payment_status, created_at=created_at,
+        ))
+        if len(batch) == 5000:
+            ServiceRequestEvent.objects.bulk_create(batch)
+            batch = []
+    ServiceRequestEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_servicerequest_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceRequestEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('request_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField()),
+                ('old_status', models.CharField(max_length=20, null=True)),
+                ('new_status', models.CharField(max_length=20, null=True)),
+                ('old_payment_status', models.CharField(max_length=15, null=True)),
+                ('new_payment_status', models.CharField(max_length=15, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['request_id', 'id'], name='request_event_request_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_created_events, migrations.RunPython.noop),
+    ]
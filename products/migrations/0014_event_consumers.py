@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_servicerequestevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventCursor',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RequestStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('payment_status', models.CharField(max_length=15)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('status', 'payment_status'), name='request_status_count_key')],
+            },
+        ),
+    ]
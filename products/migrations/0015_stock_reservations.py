@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_event_consumers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('held', 'Held'), ('consumed', 'Consumed'), ('released', 'Released')], default='held', max_length=10)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.product')),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.servicerequest')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'held')), fields=['expires_at'], name='reservation_held_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'held')), fields=('request',), name='reservation_one_held_per_request')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def snapshot_opening_stock(apps, schema_editor):
+    # Existing stock is the ledger's opening balance: a snapshot before any movement.
+    Product = apps.get_model('products', 'Product')
+    StockSnapshot = apps.get_model('products', 'StockSnapshot')
+    batch = []
+    for pk, stock, reserved in Product.objects.values_list('pk', 'stock', 'reserved').iterator(chunk_size=5000):
+        batch.append(StockSnapshot(product_id=pk, stock=stock, reserved=reserved, last_movement_id=0))
+        if len(batch) == 5000:
+            StockSnapshot.objects.bulk_create(batch)
+            batch = []
+    StockSnapshot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase'), ('adjustment', 'Adjustment'), ('reservation', 'Reservation'), ('release', 'Release')], max_length=12)),
+                ('quantity', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('request_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_id', 'id'], name='movement_product_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_id', models.BigIntegerField()),
+                ('stock', models.IntegerField()),
+                ('reserved', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_id', 'last_movement_id'], name='snapshot_product_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_opening_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,193 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .models import InsufficientStock
+
+
+def make_etag(request, *parts, version=None):
+    """
+    Strong ETag over `parts` plus everything else that shapes the response: the
+    full path (filters, search, cursor), the negotiated media type and the user.
+
+    With a `version` the tag reads `"<version>-<hash>"`, so it can be sent back
+    as If-Match to a VersionedUpdateMixin view.
+    """
+    key = '|'.join(str(part) for part in (
+        *parts,
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        request.user.pk,
+        request.user.is_staff,
+    ))
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return f'"{version}-{digest}"' if version is not None else f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for list and detail views over models with an
+    `updated_at` column.
+
+    Lists are validated by ETag only, from one `COUNT(*), SUM(id),
+    MAX(updated_at)` over the filtered queryset: an insert or update moves the
+    maximum, and a delete or soft delete changes the count, or the id sum when
+    a new row replaces it. Details use the object's own `updated_at` (and
+    `version`, if the model has one). `etag_related` names the relations whose
+    rendered fields show up in the payload; their `updated_at` is folded in
+    too. A matching `If-None-Match` (or, on details, `If-Modified-Since`) gets
+    `304 Not Modified` before anything is serialized.
+    """
+    etag_related = []
+
+    def list(self, request, *args, **kwargs):
+        aggregates = {'count': Count('pk'), 'ids': Sum('pk'), 'last_modified': Max('updated_at')}
+        for relation in self.etag_related:
+            aggregates[relation] = Max(f'{relation}__updated_at')
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(**aggregates)
+        etag = make_etag(request, *state.values())
+        return self.conditional(request, etag, None, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = instance.updated_at
+        for relation in self.etag_related:
+            # Relations left out by ?fields= aren't loaded, nor rendered.
+            related = getattr(instance, relation) if instance._meta.get_field(relation).is_cached(instance) else None
+            if related is not None:
+                last_modified = max(last_modified, related.updated_at)
+        etag = make_etag(
+            request, instance.pk, last_modified.isoformat(), version=getattr(instance, 'version', None)
+        )
+        # Reuse the instance already fetched for the ETag.
+        self.get_object = lambda: instance
+        return self.conditional(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+    def conditional(self, request, etag, last_modified, handler, *args, **kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None and not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class VersionedUpdateMixin:
+    """
+    Optimistic concurrency for updates of models with a `version` column and
+    an `update_if_current()` method (ServiceRequest).
+
+    Clients send `If-Match: "<version>"` with the version they last read, or
+    the ETag of a GET, which starts with it; without it the version loaded
+    for this request is used, which still stops a concurrent write from being
+    overwritten. Only changed fields are written, in one conditional UPDATE;
+    a lost race answers 409 Conflict and a change the stock can't cover 400.
+    The new version is returned in the body and as the response's ETag.
+    """
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        expected = self.get_expected_version(request)
+        if expected is False:
+            return Response(
+                {"error": 'If-Match must be a quoted version number, e.g. "3", or the ETag of a GET'},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        try:
+            updated = instance.update_if_current(serializer.validated_data, expected)
+        except InsufficientStock:
+            return Response({"error": "Not enough stock"}, status=status.HTTP_400_BAD_REQUEST)
+        if not updated:
+            return Response(
+                {"error": "This request was changed by someone else; reload it and try again"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = f'"{instance.version}"'
+        return response
+
+    def get_expected_version(self, request):
+        """
+        The version from If-Match, None if absent or `*`, False if malformed.
+        """
+        header = request.META.get('HTTP_IF_MATCH', '').strip()
+        if not header or header == '*':
+            return None
+        tag = header.split(',')[0].strip().removeprefix('W/').strip('"')
+        version = tag.split('-', 1)[0]
+        return int(version) if version.isdigit() else False
+
+
+class SparseQuerysetMixin:
+    """
+    Push `?fields=` / `?exclude=` (see serializers.SparseFieldsetMixin) down
+    into the queryset of a read: only the columns behind the remaining
+    serializer fields are loaded, and select_related joins for relations
+    left out are dropped.
+
+    The primary key, `updated_at` and `version` (for conditional GETs) and
+    the ordering fields (for keyset cursors) are always loaded.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if self.request.method not in SAFE_METHODS or not (params.get('fields') or params.get('exclude')):
+            return queryset
+        return self.restrict_columns(queryset, self.get_serializer())
+
+    def restrict_columns(self, queryset, serializer):
+        opts = queryset.model._meta
+        view_ordering = getattr(self, 'ordering', None) or []
+        if isinstance(view_ordering, str):
+            view_ordering = [view_ordering]
+        ordering = [*opts.ordering, *view_ordering, *self.request.query_params.get('ordering', '').split(',')]
+        columns, relations = {opts.pk.name}, set()
+        for name in ['updated_at', 'version', *ordering]:
+            name = name.strip().lstrip('-')
+            if name and name != 'pk' and self.model_field(opts, name) is not None:
+                columns.add(name)
+        computed = getattr(getattr(serializer, 'Meta', None), 'sparse_columns', {})
+        for name, field in serializer.fields.items():
+            if name in computed:
+                columns.update(computed[name])
+                continue
+            model_field = self.model_field(opts, field.source.split('.')[0])
+            if model_field is None:
+                # Computed or annotated, and not in Meta.sparse_columns;
+                # can't tell which columns it needs.
+                return queryset
+            columns.add(model_field.name)
+            if model_field.is_relation and not isinstance(field, PrimaryKeyRelatedField):
+                relations.add(model_field.name)
+
+        query = queryset.query
+        if isinstance(query.select_related, dict):
+            keep = set(query.select_related) & relations
+            queryset = queryset.select_related(None)
+            if keep:
+                queryset = queryset.select_related(*keep)
+        loaded, defer = query.deferred_loading
+        if not defer:
+            # Keep the related columns an earlier only() chose for the relations still used.
+            columns |= {name for name in loaded if '__' in name and name.split('__')[0] in relations}
+        return queryset.only(*columns)
+
+    @staticmethod
+    def model_field(opts, name):
+        try:
+            return opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
@@ -1,40 +1,200 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .signals import requests_changed, stock_changed
 
 User = get_user_model()
 
+
+class InsufficientStock(Exception):
+    """
+    Raised when a service request needs more of a product than is available.
+    """
+
 class Product(models.Model):
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)  # Supplier part number, used by catalog imports
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)  # Held for open service requests; see StockReservation
     is_active = models.BooleanField(default=True)  # Added for soft delete functionality
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def available(self):
+        """
+        Stock on hand that is not held for a service request.
+        """
+        return max(self.stock - self.reserved, 0)
 
     def sell(self, quantity):
-        if self.stock >= quantity:
-            self.stock -= quantity
-            self.save()
-            return True
-        return False
+        """
+        Atomically take `quantity` items out of available stock.
+
+        The stock check happens inside the UPDATE itself, so concurrent sells can
+        never oversell or sell stock held for a service request. Returns the new
+        stock level, or None if there was not enough stock.
+        """
+        with transaction.atomic():
+            updated = Product.objects.filter(pk=self.pk, stock__gte=F('reserved') + quantity).update(
+                stock=F('stock') - quantity, updated_at=timezone.now()
+            )
+            if not updated:
+                return None
+            if quantity:
+                InventoryMovement.record([(self.pk, 'sale', -quantity, 0, None)])
+            self.stock = Product.objects.values_list('stock', flat=True).get(pk=self.pk)
+        stock_changed.send(sender=Product, pks=[self.pk])
+        return self.stock
 
     def buy(self, quantity):
-        self.stock += quantity
-        self.save()
+        """
+        Atomically add `quantity` items to stock and return the new stock level.
+        """
+        with transaction.atomic():
+            Product.objects.filter(pk=self.pk).update(stock=F('stock') + quantity, updated_at=timezone.now())
+            if quantity:
+                InventoryMovement.record([(self.pk, 'purchase', quantity, 0, None)])
+            self.stock = Product.objects.values_list('stock', flat=True).get(pk=self.pk)
+        stock_changed.send(sender=Product, pks=[self.pk])
+        return self.stock
+
+    @classmethod
+    def adjust_stock(cls, deltas):
+        """
+        Apply many stock changes at once, all or nothing.
+
+        `deltas` maps product id to a signed quantity (negative sells, positive
+        buys). Reserved stock can't be sold. The affected rows are locked and
+        read in one query and written in one UPDATE. Returns `(stock, errors)`
+        where `stock` maps product id to the new stock level and `errors` maps
+        product id to a message; if there are any errors nothing is written.
+        """
+        with transaction.atomic():
+            current = {
+                pk: (on_hand, reserved)
+                for pk, on_hand, reserved in cls.objects.select_for_update()
+                .filter(pk__in=deltas, is_active=True)
+                .order_by('pk')
+                .values_list('pk', 'stock', 'reserved')
+            }
+            stock, errors = {}, {}
+            for pk, delta in deltas.items():
+                if pk not in current:
+                    errors[pk] = 'Product not found'
+                elif delta < 0 and current[pk][0] + delta < current[pk][1]:
+                    errors[pk] = 'Not enough stock'
+                else:
+                    stock[pk] = current[pk][0] + delta
+            if errors:
+                return {}, errors
+            # Lines that cancel out (+5 and -5 for one product) leave the row
+            # and the ledger alone.
+            changed = {pk: delta for pk, delta in deltas.items() if delta}
+            if changed:
+                cls.objects.filter(pk__in=changed).update(
+                    stock=Case(*[When(pk=pk, then=stock[pk]) for pk in changed]),
+                    updated_at=timezone.now(),
+                )
+                InventoryMovement.record([
+                    (pk, 'sale' if delta < 0 else 'purchase', delta, 0, None) for pk, delta in changed.items()
+                ])
+                stock_changed.send(sender=cls, pks=list(changed))
+        return stock, errors
+
+    def save(self, *args, **kwargs):
+        """
+        Save, recording a stock change made by editing the product (or its
+        opening stock) as an adjustment in the inventory ledger.
+
+        `reserved` only moves through StockReservation's conditional UPDATEs,
+        so saving an existing product never writes it back from this
+        instance, which may predate holds taken since; it is refreshed from
+        the locked row instead.
+        """
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and not kwargs.get('force_insert'):
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            kwargs['update_fields'] = update_fields = [name for name in update_fields if name != 'reserved']
+        if update_fields is not None and 'stock' not in update_fields:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            stored = None
+            if not self._state.adding:
+                row = Product.objects.select_for_update().filter(pk=self.pk).values_list('stock', 'reserved').first()
+                if row is not None:
+                    stored, self.reserved = row
+            super().save(*args, **kwargs)
+            if self.stock != (stored or 0):
+                InventoryMovement.record([(self.pk, 'adjustment', self.stock - (stored or 0), 0, None)])
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Catalog listing and the admin dashboard's low-stock scan only
+            # ever look at active products.
+            models.Index(fields=['id'], condition=Q(is_active=True), name='product_active_idx'),
+            models.Index(fields=['stock'], condition=Q(is_active=True, stock__lt=5), name='product_low_stock_idx'),
+            # MAX(updated_at) for conditional GETs on the catalog.
+            models.Index(fields=['updated_at'], condition=Q(is_active=True), name='product_active_updated_idx'),
+        ]
+
 
 class CarRepair(models.Model):
+    code = models.CharField(max_length=64, unique=True, null=True, blank=True)  # Catalog code, used by catalog imports
     service_name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)  # Added for soft delete functionality
 
     def __str__(self):
         return self.service_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=Q(is_active=True), name='carrepair_active_created_idx'),
+            models.Index(fields=['updated_at'], condition=Q(is_active=True), name='carrepair_active_updated_idx'),
+        ]
+
+
+class ServiceRequestQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Fetch the user, product and service rendered by ServiceRequestSerializer
+        in the same query, loading only the columns their __str__ needs.
+        """
+        own_fields = [field.attname for field in ServiceRequest._meta.concrete_fields]
+        return self.select_related('user', 'product', 'car_repair').only(
+            *own_fields, 'user__username', 'product__name', 'car_repair__service_name',
+            # For the ETags of views showing those names.
+            'user__updated_at', 'product__updated_at', 'car_repair__updated_at',
+        )
+
+    def repriceable(self):
+        """
+        Requests whose snapshot prices may still follow the catalog: open and
+        not yet paid for.
+        """
+        return self.exclude(status__in=ServiceRequest.CLOSED_STATUSES).filter(payment_status='unpaid')
+
 
 class ServiceRequest(models.Model):
     STATUS_CHOICES = [
@@ -50,7 +210,18 @@ class ServiceRequest(models.Model):
         ('partially_paid', 'Partially Paid'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    CLOSED_STATUSES = ['completed', 'cancelled']
+
+    # Allowed status moves; closed requests are final.
+    STATUS_TRANSITIONS = {
+        'pending': ['in_progress', 'cancelled'],
+        'in_progress': ['completed', 'cancelled'],
+        'completed': [],
+        'cancelled': [],
+    }
+
+    # The (user, ...) indexes in Meta cover lookups by user, so no index of its own.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
     car_repair = models.ForeignKey(CarRepair, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
@@ -58,23 +229,611 @@ class ServiceRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     payment_status = models.CharField(max_length=15, choices=PAYMENT_STATUS, default='unpaid')
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    # Catalog prices captured when the product/service was set on the request.
+    product_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    car_repair_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)  # Bumped by every write to the row
+
+    objects = ServiceRequestQuerySet.as_manager()
+
+    def can_transition_to(self, status):
+        return status == self.status or status in self.STATUS_TRANSITIONS[self.status]
+
+    def update_if_current(self, changes, expected_version=None):
+        """
+        Write the fields in `changes` that differ from this instance in one
+        UPDATE that only matches while the row is still at `expected_version`
+        (by default the version this instance was loaded at), bumping the
+        version and `updated_at`.
+
+        No row lock is taken: a concurrent writer simply makes the UPDATE
+        match nothing, and False is returned with this instance left holding
+        the rejected values. Because post_save doesn't fire, the user's
+        request summary, the stock reservation and the admin dashboard are
+        kept in step here; InsufficientStock rolls the whole update back.
+        """
+        expected = self.version if expected_version is None else expected_version
+        changes = {name: value for name, value in changes.items() if getattr(self, name) != value}
+        if not changes:
+            return expected == self.version
+
+        old_summary, old_event = self.summary_state(), self.event_state()
+        old_reservation = self.reservation_state()
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if 'quantity' in changes:
+            changes['total_price'] = self.total_price = self.calculate_total_price()
+        now = timezone.now()
+        with transaction.atomic():
+            updated = ServiceRequest.objects.filter(pk=self.pk, version=expected).update(
+                **changes, version=F('version') + 1, updated_at=now
+            )
+            if not updated:
+                return False
+            new_summary = self.summary_state()
+            if new_summary != old_summary:
+                UserRequestSummary.apply(*old_summary, sign=-1)
+                UserRequestSummary.apply(*new_summary, sign=1)
+            ServiceRequestEvent.record(self.pk, old_event, self.event_state())
+            self.sync_reservation(old_reservation)
+        self.version = expected + 1
+        self.updated_at = now
+        self._summary_state = new_summary
+        self._event_state = self.event_state()
+        self._pricing_state = self.pricing_state()
+        self._reservation_state = self.reservation_state()
+        requests_changed.send(sender=ServiceRequest)
+        return True
 
     def calculate_total_price(self):
-        total = 0
-        if self.product:
-            total += self.product.price * self.quantity
-        if self.car_repair:
-            total += self.car_repair.price
+        total = Decimal('0.00')
+        if self.product_price is not None:
+            total += self.product_price * self.quantity
+        if self.car_repair_price is not None:
+            total += self.car_repair_price
         return total
 
-    def save(self, *args, **kwargs):
+    def pricing_state(self):
+        return self.product_id, self.car_repair_id, self.quantity
+
+    def snapshot_prices(self):
+        """
+        Capture catalog prices for the product and service if they were
+        changed since the request was loaded, and recompute the total.
+
+        A status or payment change touches no pricing input, so it neither
+        queries the catalog nor moves the total.
+        """
+        old = None if self._state.adding else getattr(self, '_pricing_state', None)
+        if old is not None and old == self.pricing_state():
+            return False
+        if old is None or old[0] != self.product_id:
+            self.product_price = self._current_price('product')
+        if old is None or old[1] != self.car_repair_id:
+            self.car_repair_price = self._current_price('car_repair')
         self.total_price = self.calculate_total_price()
-        super().save(*args, **kwargs)
+        return True
+
+    def _current_price(self, name):
+        field = self._meta.get_field(name)
+        if getattr(self, field.attname) is None:
+            return None
+        if field.is_cached(self):
+            return getattr(self, name).price
+        return field.related_model.objects.values_list('price', flat=True).get(pk=getattr(self, field.attname))
+
+    @classmethod
+    def reprice(cls, product=None, car_repair=None):
+        """
+        Move open, unpaid requests for `product` or `car_repair` onto its
+        current price, in one UPDATE that also bumps their version, so
+        update_if_current() callers holding the old prices conflict. Returns
+        the number of requests updated.
+        """
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+        queryset = cls.objects.repriceable()
+        if product is not None:
+            updated = queryset.filter(product=product).update(
+                product_price=product.price,
+                total_price=product.price * F('quantity') + Coalesce('car_repair_price', zero),
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+        elif car_repair is not None:
+            updated = queryset.filter(car_repair=car_repair).update(
+                car_repair_price=car_repair.price,
+                total_price=Coalesce(F('product_price') * F('quantity'), zero) + car_repair.price,
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+        else:
+            raise ValueError('Pass a product or a car_repair to reprice.')
+        if updated:
+            requests_changed.send(sender=cls)
+        return updated
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'user_id', 'status', 'payment_status'}.issubset(field_names):
+            instance._summary_state = instance.summary_state()
+            instance._event_state = instance.event_state()
+        if {'product_id', 'car_repair_id', 'quantity'}.issubset(field_names):
+            instance._pricing_state = instance.pricing_state()
+        if {'product_id', 'quantity', 'status'}.issubset(field_names):
+            instance._reservation_state = instance.reservation_state()
+        return instance
+
+    def summary_state(self):
+        """
+        The user this request is counted against and its contribution to the
+        (active, completed, unpaid) counters of UserRequestSummary.
+        """
+        return self.user_id, ServiceRequest.summary_counts(self.status, self.payment_status)
+
+    @staticmethod
+    def summary_counts(status, payment_status):
+        return (
+            int(status not in ServiceRequest.CLOSED_STATUSES),
+            int(status == 'completed'),
+            int(payment_status == 'unpaid'),
+        )
+
+    def event_state(self):
+        return self.user_id, self.status, self.payment_status
+
+    def reservation_state(self):
+        return self.product_id, self.quantity, self.status
+
+    def sync_reservation(self, old):
+        """
+        Bring the stock held for this request in line with its product,
+        quantity and status, given the (product, quantity, status) it had
+        before (None if new).
+
+        Pending requests hold stock until the hold expires, in-progress ones
+        hold it until they close, completing sells it and cancelling gives it
+        back. Closed requests never touch stock again. Raises
+        InsufficientStock when a hold or sale can't be covered.
+        """
+        new = self.reservation_state()
+        if old == new or (old is not None and old[2] in self.CLOSED_STATUSES):
+            return
+        changed = old is None or old[:2] != new[:2]
+        if old is not None and (changed or self.status == 'cancelled'):
+            StockReservation.release(self)
+        if self.product_id is None:
+            return
+        if self.status == 'completed':
+            StockReservation.consume(self)
+        elif self.status == 'in_progress':
+            StockReservation.pin(self)
+        elif self.status == 'pending' and changed:
+            StockReservation.hold(self)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.snapshot_prices() and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'product_price', 'car_repair_price', 'total_price'}
+        # Any write to an existing row moves its version, so an admin edit or a
+        # serializer save invalidates If-Match values handed out before it.
+        loaded_version = None if self._state.adding else self.version
+        if loaded_version is not None:
+            self.version = F('version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        # Keeps the post_save update of UserRequestSummary, the status event
+        # and the stock reservation in the same transaction as the row.
+        try:
+            with transaction.atomic():
+                old_state = self._stored_event_state(update_fields)
+                old_reservation = self._stored_reservation_state(update_fields)
+                super().save(*args, **kwargs)
+                if loaded_version is not None:
+                    self.refresh_from_db(fields=['version'])
+                if old_state is not False:
+                    ServiceRequestEvent.record(self.pk, old_state, self.event_state())
+                if old_reservation is not False:
+                    self.sync_reservation(old_reservation)
+        except Exception:
+            if loaded_version is not None:
+                self.version = loaded_version
+            raise
+        self._pricing_state = self.pricing_state()
+        self._event_state = self.event_state()
+        self._reservation_state = self.reservation_state()
+
+    def _stored_event_state(self, update_fields):
+        """
+        The (user, status, payment status) currently stored for this request,
+        None if it is new, or False if this save can't change them.
+        """
+        if update_fields is not None and not {'user', 'user_id', 'status', 'payment_status'} & set(update_fields):
+            return False
+        if self._state.adding:
+            return None
+        if hasattr(self, '_event_state'):
+            return self._event_state
+        return ServiceRequest.objects.filter(pk=self.pk).values_list('user_id', 'status', 'payment_status').first()
+
+    def _stored_reservation_state(self, update_fields):
+        """
+        Like _stored_event_state, for (product, quantity, status).
+        """
+        if update_fields is not None and not {'product', 'product_id', 'quantity', 'status'} & set(update_fields):
+            return False
+        if self._state.adding:
+            return None
+        if hasattr(self, '_reservation_state'):
+            return self._reservation_state
+        return ServiceRequest.objects.filter(pk=self.pk).values_list('product_id', 'quantity', 'status').first()
 
     def __str__(self):
         return f"Service Request #{self.id} - {self.user.username}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination: (ordering field, id), optionally per user.
+            models.Index(fields=['created_at', 'id'], name='request_created_id_idx'),
+            models.Index(fields=['total_price', 'id'], name='request_price_id_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='request_user_created_id_idx'),
+            models.Index(fields=['user', 'total_price', 'id'], name='request_user_price_id_idx'),
+            # ?status= / ?payment_status= filters, newest first.
+            models.Index(fields=['status', 'created_at', 'id'], name='request_status_created_idx'),
+            models.Index(fields=['payment_status', 'created_at', 'id'], name='request_payment_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at', 'id'], name='request_user_status_idx'),
+            models.Index(fields=['user', 'payment_status', 'created_at', 'id'], name='request_user_payment_idx'),
+        ]
+
+
+class UserRequestSummary(models.Model):
+    """
+    Per-user request counters behind the user dashboard.
+
+    Kept current by the ServiceRequest post_save/post_delete receivers; rows
+    that are missing are rebuilt from ServiceRequest on demand.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='request_summary')
+    active_requests = models.PositiveIntegerField(default=0)
+    completed_requests = models.PositiveIntegerField(default=0)
+    pending_payments = models.PositiveIntegerField(default=0)
+
+    COUNTERS = ['active_requests', 'completed_requests', 'pending_payments']
+
+    @classmethod
+    def apply(cls, user_id, counts, sign):
+        if not any(counts):
+            return
+        updated = cls.objects.filter(pk=user_id).update(**{
+            name: F(name) + sign * count
+            for name, count in zip(cls.COUNTERS, counts) if count
+        })
+        # A missing row is only created when adding, so a cascading user
+        # delete never recreates the summary it is removing.
+        if not updated and sign > 0:
+            cls.rebuild(user_ids=[user_id])
+
+    @staticmethod
+    def compute(user_ids=None):
+        """
+        Count from scratch, in one grouped query. Returns {user_id: counters}.
+        """
+        queryset = ServiceRequest.objects.order_by()
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        rows = queryset.values('user_id').annotate(
+            active_requests=Count('id', filter=~Q(status__in=ServiceRequest.CLOSED_STATUSES)),
+            completed_requests=Count('id', filter=Q(status='completed')),
+            pending_payments=Count('id', filter=Q(payment_status='unpaid')),
+        )
+        return {row.pop('user_id'): row for row in rows}
+
+    @classmethod
+    def rebuild(cls, user_ids=None, counts=None):
+        """
+        Overwrite the summaries of `user_ids` (all users by default) with
+        `counts`, by default counted afresh from ServiceRequest.
+        """
+        counts = cls.compute(user_ids) if counts is None else counts
+        with transaction.atomic():
+            if user_ids is None:
+                cls.objects.exclude(pk__in=counts).delete()
+            for user_id in user_ids or []:
+                counts.setdefault(user_id, dict.fromkeys(cls.COUNTERS, 0))
+            for user_id, values in counts.items():
+                cls.objects.update_or_create(user_id=user_id, defaults=values)
+        return counts
+
+    @classmethod
+    def for_user(cls, user):
+        summary = cls.objects.filter(pk=user.pk).first()
+        if summary is None:
+            cls.rebuild(user_ids=[user.pk])
+            summary = cls.objects.get(pk=user.pk)
+        return summary
+
+class ServiceRequestEvent(models.Model):
+    """
+    Append-only log of ServiceRequest status and payment status changes.
+
+    Rows are written in the same transaction as the change they describe
+    (a transactional outbox), so the log never misses or invents a change.
+    A creation has no old values and a deletion no new ones. `id` orders the
+    log and is the cursor consumers read from (see products/events.py).
+    """
+    id = models.BigAutoField(primary_key=True)
+    # Plain columns rather than foreign keys so history outlives the request.
+    request_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    old_status = models.CharField(max_length=20, null=True)
+    new_status = models.CharField(max_length=20, null=True)
+    old_payment_status = models.CharField(max_length=15, null=True)
+    new_payment_status = models.CharField(max_length=15, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def record(cls, request_id, old, new):
+        """
+        Append the events for a request moving from `old` to `new`, each a
+        (user_id, status, payment_status) tuple or None. Moving a request to
+        another user is logged as a deletion for one and a creation for the
+        other.
+        """
+        if old == new:
+            return
+        if old is not None and new is not None and old[0] != new[0]:
+            events = [(old[0], old, None), (new[0], None, new)]
+        else:
+            events = [((new or old)[0], old, new)]
+        cls.objects.bulk_create([
+            cls(
+                request_id=request_id,
+                user_id=user_id,
+                old_status=before and before[1],
+                old_payment_status=before and before[2],
+                new_status=after and after[1],
+                new_payment_status=after and after[2],
+            )
+            for user_id, before, after in events
+        ])
+
+    class Meta:
+        indexes = [
+            # Per-request history.
+            models.Index(fields=['request_id', 'id'], name='request_event_request_idx'),
+        ]
+
+
+class EventCursor(models.Model):
+    """
+    How far a named consumer has read the ServiceRequestEvent log.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    position = models.BigIntegerField(default=0)  # id of the last event consumed
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class RequestStatusCount(models.Model):
+    """
+    Number of service requests per (status, payment status), fed from the
+    event log by the `request-status-counts` consumer for the admin dashboard.
+    """
+    status = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=15)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'payment_status'], name='request_status_count_key'),
+        ]
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a service request, so two open requests can't both be
+    promised the last part.
+
+    Holding stock raises Product.reserved in the same conditional UPDATE
+    that checks availability, so available stock (stock - reserved) is read
+    without summing reservations. A hold ends as `consumed` when the request
+    completes (the stock is sold) or `released` when it is cancelled,
+    changed, or expires; release_expired() is the sweeper for the last case.
+    At most one hold per request is `held` at a time.
+    """
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('consumed', 'Consumed'),
+        ('released', 'Released'),
+    ]
+
+    request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField(null=True, blank=True)  # None: held until the request closes
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def expiry():
+        return timezone.now() + timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 48 * 60 * 60))
+
+    @classmethod
+    def hold(cls, request, expires=True):
+        """
+        Reserve the request's quantity of its product, if that much is
+        available; raises InsufficientStock otherwise.
+        """
+        updated = Product.objects.filter(
+            pk=request.product_id, stock__gte=F('reserved') + request.quantity
+        ).update(reserved=F('reserved') + request.quantity, updated_at=timezone.now())
+        if not updated:
+            raise InsufficientStock(f'Not enough stock to reserve {request.quantity} of product {request.product_id}')
+        InventoryMovement.record([(request.product_id, 'reservation', 0, request.quantity, request.pk)])
+        stock_changed.send(sender=Product, pks=[request.product_id])
+        return cls.objects.create(
+            request=request, product_id=request.product_id, quantity=request.quantity,
+            expires_at=cls.expiry() if expires else None,
+        )
+
+    @classmethod
+    def pin(cls, request):
+        """
+        Keep the request's hold until the request closes, taking a new hold
+        if the old one has expired.
+        """
+        if not cls.objects.filter(request=request, status='held').update(expires_at=None, updated_at=timezone.now()):
+            cls.hold(request, expires=False)
+
+    @classmethod
+    def release(cls, request, status='released'):
+        """
+        End the request's hold as `status`, taking the stock out of
+        Product.reserved (and out of stock too when consumed). Returns False
+        if the request held nothing.
+        """
+        held = cls.objects.filter(request=request, status='held').values_list('pk', 'product_id', 'quantity').first()
+        if held is None:
+            return False
+        pk, product_id, quantity = held
+        now = timezone.now()
+        # Claim the hold first so a concurrent sweep can't release it twice.
+        if not cls.objects.filter(pk=pk, status='held').update(status=status, updated_at=now):
+            return False
+        changes = {'reserved': F('reserved') - quantity, 'updated_at': now}
+        if status == 'consumed':
+            changes['stock'] = F('stock') - quantity
+        Product.objects.filter(pk=product_id).update(**changes)
+        if status == 'consumed':
+            InventoryMovement.record([(product_id, 'sale', -quantity, -quantity, request.pk)])
+        else:
+            InventoryMovement.record([(product_id, 'release', 0, -quantity, request.pk)])
+        stock_changed.send(sender=Product, pks=[product_id])
+        return True
+
+    @classmethod
+    def consume(cls, request):
+        """
+        Sell the request's quantity: from its hold if it still has one,
+        otherwise from available stock; raises InsufficientStock if neither
+        covers it.
+        """
+        if cls.release(request, status='consumed'):
+            return
+        updated = Product.objects.filter(
+            pk=request.product_id, stock__gte=F('reserved') + request.quantity
+        ).update(stock=F('stock') - request.quantity, updated_at=timezone.now())
+        if not updated:
+            raise InsufficientStock(f'Not enough stock to sell {request.quantity} of product {request.product_id}')
+        InventoryMovement.record([(request.product_id, 'sale', -request.quantity, 0, request.pk)])
+        stock_changed.send(sender=Product, pks=[request.product_id])
+        cls.objects.create(request=request, product_id=request.product_id, quantity=request.quantity, status='consumed')
+
+    @classmethod
+    def release_expired(cls, batch_size=500, now=None):
+        """
+        Release holds past their expiry, `batch_size` per transaction. Each
+        batch is locked, marked released and taken out of Product.reserved
+        with one UPDATE. Returns the number of holds released.
+        """
+        now = now or timezone.now()
+        released = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    cls.objects.select_for_update()
+                    .filter(status='held', expires_at__lte=now)
+                    .order_by('expires_at', 'pk')
+                    .values_list('pk', 'product_id', 'quantity', 'request_id')[:batch_size]
+                )
+                if not rows:
+                    return released
+                cls.objects.filter(pk__in=[pk for pk, _, _, _ in rows]).update(status='released', updated_at=now)
+                totals = Counter()
+                for _, product_id, quantity, _ in rows:
+                    totals[product_id] += quantity
+                Product.objects.filter(pk__in=totals).update(
+                    reserved=Case(*[When(pk=pk, then=F('reserved') - quantity) for pk, quantity in totals.items()]),
+                    updated_at=now,
+                )
+                InventoryMovement.record([
+                    (product_id, 'release', 0, -quantity, request_id) for _, product_id, quantity, request_id in rows
+                ])
+                stock_changed.send(sender=Product, pks=list(totals))
+            released += len(rows)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['request'], condition=Q(status='held'), name='reservation_one_held_per_request'),
+        ]
+        indexes = [
+            # The sweeper's scan for expired holds.
+            models.Index(fields=['expires_at'], condition=Q(status='held'), name='reservation_held_expiry_idx'),
+        ]
+
+
+class InventoryMovement(models.Model):
+    """
+    Append-only ledger of stock movements: one row per change to a product's
+    on-hand (`quantity`) or reserved (`reserved`) stock, written in the same
+    transaction as the change, so the ledger always adds up to Product.stock
+    and Product.reserved.
+
+    Current levels can be derived from a product's latest StockSnapshot plus
+    the movements after it (see products/ledger.py); Product.stock stays the
+    maintained counter that reads and the oversell check use.
+    """
+    KIND_CHOICES = [
+        ('sale', 'Sale'),
+        ('purchase', 'Purchase'),
+        ('adjustment', 'Adjustment'),
+        ('reservation', 'Reservation'),
+        ('release', 'Release'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Plain columns rather than foreign keys so history outlives the rows.
+    product_id = models.BigIntegerField()
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    quantity = models.IntegerField(default=0)  # Change to on-hand stock
+    reserved = models.IntegerField(default=0)  # Change to reserved stock
+    request_id = models.BigIntegerField(null=True, blank=True)  # Service request behind a reservation or sale
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def record(cls, movements):
+        """
+        Append `(product_id, kind, quantity, reserved, request_id)` tuples.
+        """
+        cls.objects.bulk_create([
+            cls(product_id=product_id, kind=kind, quantity=quantity, reserved=reserved, request_id=request_id)
+            for product_id, kind, quantity, reserved, request_id in movements
+        ])
+
+    class Meta:
+        indexes = [
+            # Per-product history and the movements after a snapshot.
+            models.Index(fields=['product_id', 'id'], name='movement_product_idx'),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """
+    A product's stock and reserved levels after every ledger movement up to
+    `last_movement_id`, written by ledger.compact().
+    """
+    id = models.BigAutoField(primary_key=True)
+    product_id = models.BigIntegerField()
+    stock = models.IntegerField()
+    reserved = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Latest snapshot per product.
+            models.Index(fields=['product_id', 'last_movement_id'], name='snapshot_product_idx'),
+        ]
@@ -0,0 +1,161 @@
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row count for `queryset` from the PostgreSQL planner instead of COUNT(*).
+
+    Other databases fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering field, id).
+
+    The ordering comes from the view's OrderingFilter (so `?ordering=` keeps
+    working), then search relevance if the queryset was ranked by
+    FullTextSearchFilter, then `view.ordering`, then the model's default
+    ordering; `id` is always added as a tiebreaker. Each page is a
+    `WHERE (field, id) < cursor` range scan, so fetching page 1000 costs the
+    same as page 1 given an index on (field, id).
+
+    `?mode=offset&page=N` switches to numbered pages with an estimated total
+    for the admin UI.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    mode_query_param = 'mode'
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field, descending = self.get_ordering(request, queryset, view)
+        self.field = field
+        self.descending = descending
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(*dict.fromkeys([f'{prefix}{field}', f'{prefix}id']))
+
+        if request.query_params.get(self.mode_query_param) == 'offset':
+            return self.paginate_offset(queryset, request)
+        self.offset_mode = False
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': pk})
+            )
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def paginate_offset(self, queryset, request):
+        self.offset_mode = True
+        try:
+            self.page_number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            raise NotFound('Invalid page.')
+        self.count = estimate_count(queryset)
+        start = (self.page_number - 1) * self.page_size
+        page = list(queryset[start:start + self.page_size + 1])
+        if not page and self.page_number > 1:
+            raise NotFound('Invalid page.')
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.offset_mode:
+            return Response({
+                'count': self.count,
+                'count_is_estimate': True,
+                'next': self.get_page_link(self.page_number + 1) if self.has_next else None,
+                'previous': self.get_page_link(self.page_number - 1) if self.page_number > 1 else None,
+                'results': data,
+            })
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        if view is not None:
+            for backend in getattr(view, 'filter_backends', []):
+                if issubclass(backend, filters.OrderingFilter):
+                    if backend.ordering_param in request.query_params:
+                        ordering = backend().get_ordering(request, queryset, view)
+                    break
+        if not ordering and 'search_rank' in queryset.query.annotations:
+            ordering = ['-search_rank']
+        if not ordering and view is not None:
+            ordering = getattr(view, 'ordering', None)
+        ordering = ordering or queryset.model._meta.ordering or ['-id']
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        term = ordering[0]
+        descending = term.startswith('-')
+        field = term.lstrip('-')
+        return ('id' if field == 'pk' else field), descending
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return value, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor.')
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif not isinstance(value, (int, str)) and value is not None:
+            value = str(value)
+        return base64.urlsafe_b64encode(json.dumps([value, instance.pk]).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_page_link(self, number):
+        url = self.request.build_absolute_uri()
+        if number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, number)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser decoding with orjson when it is installed. Like JSONParser,
+    NaN and Infinity are rejected.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
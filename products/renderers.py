@@ -0,0 +1,85 @@
+import csv
+import datetime
+import io
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Selects CSV for streaming exports. Streamed bodies bypass the renderer;
+    `render()` only handles error payloads.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data.items() if isinstance(data, dict) else [('detail', data)]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([key for key, _ in items])
+        writer.writerow([value for _, value in items])
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Selects newline-delimited JSON for streaming exports; see CSVRenderer.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=DjangoJSONEncoder) + '\n').encode(self.charset)
+
+
+class ExactJSONEncoder(JSONEncoder):
+    """
+    DRF's JSONEncoder without its lossy cases: decimals are written as
+    strings rather than floats, and datetimes and times keep their
+    microseconds.
+    """
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        if isinstance(obj, (datetime.datetime, datetime.time)):
+            value = obj.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return super().default(obj)
+
+
+exact_encoder = ExactJSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson, falling back to the standard library
+    when it is not installed. Both paths encode with ExactJSONEncoder's
+    rules, so output is the same apart from whitespace.
+    """
+    encoder_class = ExactJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=exact_encoder.default, option=option)
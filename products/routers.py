@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RequestRouting:
+    """
+    Where the reads of the current request go: `replica` is the alias picked
+    for the request, or None once it has to read from the primary.
+    """
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+@contextmanager
+def route_request(replica):
+    """
+    Route the reads in the block to `replica` (None for the primary) until
+    something is written.
+    """
+    routing = RequestRouting(replica)
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Send the reads in the block to the primary.
+    """
+    routing = _routing.get()
+    if routing is None or routing.replica is None:
+        yield
+        return
+    replica, routing.replica = routing.replica, None
+    try:
+        yield
+    finally:
+        if not routing.wrote:
+            routing.replica = replica
+
+
+def reading_from_replica():
+    routing = _routing.get()
+    return routing is not None and routing.replica is not None
+
+
+class ReplicaRouter:
+    """
+    Send the reads of safe-method requests to a read replica and everything
+    else to the primary (`default`).
+
+    ReplicaRoutingMiddleware picks the replica per request. Reads outside a
+    request (management commands, consumers), inside a transaction on the
+    primary, or after the request has written anything go to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.replica = None
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
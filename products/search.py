@@ -0,0 +1,119 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# Tables with a maintained text index, and the columns indexed in weight order.
+# The index itself is created by migration 0008: a trigger-maintained tsvector
+# column with a GIN index on PostgreSQL, an FTS5 table kept in sync by
+# triggers on SQLite.
+SEARCH_INDEXES = {
+    'products_product': ('name', 'description'),
+    'products_carrepair': ('service_name', 'description'),
+}
+
+_fts5_tables = {}
+
+
+def search_backend(queryset):
+    """
+    'postgresql' or 'fts5' if `queryset`'s table has a text index on its
+    database, otherwise None.
+    """
+    table = queryset.model._meta.db_table
+    if table not in SEARCH_INDEXES:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        key = (connection.alias, connection.settings_dict['NAME'])
+        if key not in _fts5_tables:
+            _fts5_tables[key] = f'{table}_fts' in connection.introspection.table_names()
+        return 'fts5' if _fts5_tables[key] else None
+    return None
+
+
+def search(queryset, text):
+    """
+    Filter `queryset` to rows matching every word of `text`, the last word as a
+    prefix so partial input works for typeahead, and annotate `search_rank`
+    (higher is better).
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return queryset
+    table = queryset.model._meta.db_table
+    backend = search_backend(queryset)
+
+    if backend == 'postgresql':
+        query = ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+        rank = RawSQL(
+            f'ts_rank("{table}"."search_vector", to_tsquery(\'english\', %s))', [query],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank).filter(RawSQL(
+            f'"{table}"."search_vector" @@ to_tsquery(\'english\', %s)', [query],
+            output_field=BooleanField(),
+        ))
+
+    if backend == 'fts5':
+        query = ' '.join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+        weights = ', '.join(['10.0'] + ['1.0'] * (len(SEARCH_INDEXES[table]) - 1))
+        # bm25() is lower-is-better, so negate it.
+        rank = RawSQL(
+            f'SELECT -bm25("{table}_fts", {weights}) FROM "{table}_fts" '
+            f'WHERE "{table}_fts" MATCH %s AND "{table}_fts".rowid = "{table}"."id"', [query],
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank).filter(
+            pk__in=RawSQL(f'SELECT rowid FROM "{table}_fts" WHERE "{table}_fts" MATCH %s', [query])
+        )
+
+    raise ValueError(f'No text index for {table} on this database')
+
+
+def ensure_sqlite_triggers(connection):
+    """
+    Recreate the FTS5 sync triggers if they are missing.
+
+    SQLite drops a table's triggers when a migration rebuilds the table, so
+    this runs after every migrate (see signals.py).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    tables = connection.introspection.table_names()
+    with connection.cursor() as cursor:
+        for table, columns in SEARCH_INDEXES.items():
+            fts = f'{table}_fts'
+            if fts not in tables:
+                continue
+            names = ', '.join(columns)
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+            cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+            END''')
+            cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+            END''')
+            cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+                INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+            END''')
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the maintained text index, ranked by relevance.
+
+    Falls back to SearchFilter's `icontains` over `search_fields` on databases
+    without an index.
+    """
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip() or search_backend(queryset) is None:
+            return super().filter_queryset(request, queryset, view)
+        return search(queryset, text)
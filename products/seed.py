@@ -0,0 +1,143 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    CarRepair, InventoryMovement, Product, ServiceRequest, ServiceRequestEvent, StockReservation, StockSnapshot,
+    UserRequestSummary,
+)
+
+User = get_user_model()
+
+SEED_PREFIX = 'seed-'
+
+
+def seed(users=100, products=1000, services=100, requests=10000, batch_size=5000, rng=None):
+    """
+    Bulk-insert a synthetic data set for benchmarks.
+
+    Seeded users are named `seed-<n>` and own every seeded request; products and
+    services are named with the same prefix so `unseed()` can remove them. All
+    seeded users share one password hash, `seed-password`. Open requests for a
+    product hold its stock like real ones do; one that would overdraw the
+    product is seeded as cancelled instead.
+    """
+    rng = rng or random.Random(0)
+    now = timezone.now()
+    password = make_password('seed-password')
+    start = User.objects.filter(username__startswith=SEED_PREFIX).count()
+
+    with transaction.atomic():
+        user_objs = User.objects.bulk_create(
+            [User(username=f'{SEED_PREFIX}{start + i}', password=password) for i in range(users)],
+            batch_size=batch_size,
+        )
+        product_objs = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f'{SEED_PREFIX}part {i}',
+                    description=f'Replacement part {i} for {rng.choice(["sedan", "truck", "van"])} models',
+                    price=Decimal(rng.randint(100, 50000)) / 100,
+                    stock=rng.randint(0, 200),
+                    is_active=rng.random() > 0.05,
+                )
+                for i in range(products)
+            ],
+            batch_size=batch_size,
+        )
+        InventoryMovement.record([(product.pk, 'adjustment', product.stock, 0, None) for product in product_objs])
+        service_objs = CarRepair.objects.bulk_create(
+            [
+                CarRepair(
+                    service_name=f'{SEED_PREFIX}service {i}',
+                    description=f'Service package {i}',
+                    price=Decimal(rng.randint(1000, 100000)) / 100,
+                    is_active=rng.random() > 0.05,
+                )
+                for i in range(services)
+            ],
+            batch_size=batch_size,
+        )
+
+        statuses = [choice for choice, _ in ServiceRequest.STATUS_CHOICES]
+        payment_statuses = [choice for choice, _ in ServiceRequest.PAYMENT_STATUS]
+        batch = []
+        for i in range(requests):
+            product = rng.choice(product_objs) if rng.random() < 0.7 else None
+            service = rng.choice(service_objs) if product is None or rng.random() < 0.3 else None
+            quantity = rng.randint(1, 4)
+            status = rng.choice(statuses)
+            if product is not None and status not in ServiceRequest.CLOSED_STATUSES:
+                if product.stock - product.reserved < quantity:
+                    status = 'cancelled'
+                else:
+                    product.reserved += quantity
+            batch.append(ServiceRequest(
+                user=rng.choice(user_objs),
+                product=product,
+                car_repair=service,
+                quantity=quantity,
+                status=status,
+                payment_status=rng.choice(payment_statuses),
+                product_price=product.price if product else None,
+                car_repair_price=service.price if service else None,
+                total_price=(product.price * quantity if product else 0) + (service.price if service else 0),
+            ))
+            if len(batch) == batch_size or i == requests - 1:
+                _create_requests(batch, now, rng)
+                batch = []
+        Product.objects.bulk_update(
+            [product for product in product_objs if product.reserved], ['reserved'], batch_size=batch_size
+        )
+        UserRequestSummary.rebuild(user_ids=[user.pk for user in user_objs])
+    return user_objs
+
+
+def unseed():
+    """
+    Remove everything created by `seed()`.
+
+    The service request event log is append-only, so seeded events stay and
+    the deletions logged here net them out of the aggregates fed from it.
+    """
+    with transaction.atomic():
+        User.objects.filter(username__startswith=SEED_PREFIX).delete()
+        products = Product.objects.filter(name__startswith=SEED_PREFIX)
+        product_ids = list(products.values_list('pk', flat=True))
+        products.delete()
+        InventoryMovement.objects.filter(product_id__in=product_ids).delete()
+        StockSnapshot.objects.filter(product_id__in=product_ids).delete()
+        CarRepair.objects.filter(service_name__startswith=SEED_PREFIX).delete()
+
+
+def _create_requests(batch, now, rng):
+    ServiceRequest.objects.bulk_create(batch)
+    # auto_now_add overrides explicit values on insert, so spread the dates
+    # over the last year afterwards.
+    for request in batch:
+        request.created_at = now - timedelta(minutes=rng.randint(0, 525600))
+    ServiceRequest.objects.bulk_update(batch, ['created_at'], batch_size=1000)
+    ServiceRequestEvent.objects.bulk_create([
+        ServiceRequestEvent(
+            request_id=request.pk, user_id=request.user_id, new_status=request.status,
+            new_payment_status=request.payment_status, created_at=request.created_at,
+        )
+        for request in batch
+    ])
+    held = [request for request in batch if request.product_id and request.status not in ServiceRequest.CLOSED_STATUSES]
+    expires_at = StockReservation.expiry()
+    StockReservation.objects.bulk_create([
+        StockReservation(
+            request=request, product_id=request.product_id, quantity=request.quantity,
+            expires_at=expires_at if request.status == 'pending' else None,
+        )
+        for request in held
+    ])
+    InventoryMovement.record([
+        (request.product_id, 'reservation', 0, request.quantity, request.pk) for request in held
+    ])
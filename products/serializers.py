@@ -1,11 +1,45 @@
 from rest_framework import serializers
-from .models import Product, CarRepair, ServiceRequest
+from rest_framework.permissions import SAFE_METHODS
+from .models import Product, CarRepair, ServiceRequest, ServiceRequestEvent, InventoryMovement
+
+class SparseFieldsetMixin:
+    """
+    `?fields=a,b` keeps only those fields in responses to reads and
+    `?exclude=c,d` drops fields; unknown names are a 400. Views using
+    mixins.SparseQuerysetMixin also stop loading the columns left out;
+    `Meta.sparse_columns` names the columns behind computed fields.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        for param in ('fields', 'exclude'):
+            names = [name.strip() for name in request.query_params.get(param, '').split(',') if name.strip()]
+            unknown = sorted(set(names) - set(self.fields))
+            if unknown:
+                raise serializers.ValidationError({param: [f"Unknown field: {name}" for name in unknown]})
+            if names:
+                keep = set(names) if param == 'fields' else set(self.fields) - set(names)
+                for name in list(self.fields):
+                    if name not in keep:
+                        self.fields.pop(name)
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    available = serializers.IntegerField(read_only=True)
 
-class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ['is_active']
+        read_only_fields = ['is_active', 'reserved']
+        sparse_columns = {'available': ['stock', 'reserved']}
+
+    def validate_stock(self, value):
+        if self.instance is not None and value < self.instance.reserved:
+            raise serializers.ValidationError(
+                f"{self.instance.reserved} items are reserved for service requests; stock can't go below that."
+            )
+        return value
 
 class SellProductSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
@@ -13,13 +47,43 @@ class SellProductSerializer(serializers.Serializer):
 class BuyProductSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
 
-class CarRepairSerializer(serializers.ModelSerializer):
+class StockLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    delta = serializers.IntegerField()
+
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Delta must not be zero.")
+        return value
+
+class CarRepairSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = CarRepair
         fields = '__all__'
         read_only_fields = ['is_active']
 
-class ServiceRequestSerializer(serializers.ModelSerializer):
+class ProductImportSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+class CarRepairImportSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=64)
+    service_name = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    is_active = serializers.BooleanField(required=False)
+
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    kind = serializers.ChoiceField(choices=['products', 'services'])
+    format = serializers.ChoiceField(choices=['csv', 'jsonl'], required=False)
+    resume_from = serializers.IntegerField(min_value=0, default=0)
+
+class ServiceRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     total_price = serializers.DecimalField(read_only=True, max_digits=10, decimal_places=2)
     user = serializers.StringRelatedField(read_only=True)
     product = serializers.StringRelatedField()
@@ -28,9 +92,28 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = ServiceRequest
         fields = '__all__'
-        read_only_fields = ['status', 'payment_status', 'total_price', 'created_at', 'updated_at', 'user']
+        read_only_fields = [
+            'status', 'payment_status', 'total_price', 'product_price', 'car_repair_price',
+            'created_at', 'updated_at', 'user', 'version',
+        ]
 
 class ServiceRequestUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ServiceRequest
-        fields = ['status', 'payment_status', 'notes']
\ No newline at end of file
+        fields = ['status', 'payment_status', 'notes', 'version']
+        read_only_fields = ['version']
+
+    def validate_status(self, value):
+        if self.instance is not None and not self.instance.can_transition_to(value):
+            raise serializers.ValidationError(f"Cannot move a {self.instance.status} request to {value}.")
+        return value
+
+class ServiceRequestEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ServiceRequestEvent
+        fields = '__all__'
+
+class InventoryMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InventoryMovement
+        fields = '__all__'
\ No newline at end of file
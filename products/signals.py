@@ -0,0 +1,71 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from .cache import admin_dashboard_cache
+from .search import ensure_sqlite_triggers
+
+# Sent by Product.sell/buy/adjust_stock and StockReservation, which write
+# with queryset.update() and so bypass post_save.
+stock_changed = Signal()
+
+# Sent by bulk ServiceRequest updates (ServiceRequest.reprice), for the same
+# reason.
+requests_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender='products.ServiceRequest')
+@receiver([post_save, post_delete], sender='products.Product')
+@receiver([post_save, post_delete], sender='products.CarRepair')
+@receiver([stock_changed, requests_changed])
+def invalidate_admin_dashboard(sender, **kwargs):
+    transaction.on_commit(admin_dashboard_cache.invalidate)
+
+
+@receiver(post_save, sender='products.ServiceRequest')
+def update_request_summary_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'user', 'status', 'payment_status'} & set(update_fields):
+        return
+    summary = sender._meta.apps.get_model('products', 'UserRequestSummary')
+    new = instance.summary_state()
+    if created:
+        old = None
+    elif hasattr(instance, '_summary_state'):
+        old = instance._summary_state
+    else:
+        # Saved from an instance we never saw loaded; recount this user.
+        summary.rebuild(user_ids=[instance.user_id])
+        instance._summary_state = new
+        return
+    if old != new:
+        if old is not None:
+            summary.apply(*old, sign=-1)
+        summary.apply(*new, sign=1)
+    instance._summary_state = new
+
+
+@receiver(post_delete, sender='products.ServiceRequest')
+def update_request_summary_on_delete(sender, instance, **kwargs):
+    summary = sender._meta.apps.get_model('products', 'UserRequestSummary')
+    if hasattr(instance, '_summary_state'):
+        summary.apply(*instance._summary_state, sign=-1)
+    else:
+        summary.rebuild(user_ids=[instance.user_id])
+
+
+@receiver(post_delete, sender='products.ServiceRequest')
+def record_request_deleted(sender, instance, **kwargs):
+    event = sender._meta.apps.get_model('products', 'ServiceRequestEvent')
+    event.record(instance.pk, getattr(instance, '_event_state', instance.event_state()), None)
+
+
+@receiver(pre_delete, sender='products.ServiceRequest')
+def release_reservation_on_delete(sender, instance, **kwargs):
+    reservation = sender._meta.apps.get_model('products', 'StockReservation')
+    reservation.release(instance)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'products':
+        ensure_sqlite_triggers(connections[using])
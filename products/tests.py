@@ -1,3 +1,1345 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APITestCase
+
+from users.authentication import token_cache
+
+from . import async_views
+from .async_views import run_in_thread
+from .cache import admin_dashboard_cache
+from .events import EventConsumer, request_status_counts
+from .loadtest import SCENARIOS, Fixture, run_scenario
+from .metrics import registry
+from .middleware import QueryRecorder, ReplicaRoutingMiddleware, current_query_recorder
+from .importer import CatalogImporter
+from .ledger import compact, stock_levels, verify
+from .models import (
+    CarRepair, InsufficientStock, InventoryMovement, Product, RequestStatusCount, ServiceRequest,
+    ServiceRequestEvent, StockReservation, StockSnapshot, UserRequestSummary,
+)
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .routers import ReplicaRouter, route_request, use_primary
+from .seed import seed, unseed
+
+User = get_user_model()
+
+
+class QueryBudgetMixin:
+    """
+    Assert that a GET runs a fixed number of queries however many rows it returns.
+
+    Caches are cleared before each measurement so the count is the cold-cache
+    cost of the endpoint.
+    """
+    def count_queries(self, url):
+        token_cache.clear()
+        admin_dashboard_cache.invalidate()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryBudget(self, url, budget, add_rows):
+        """
+        Measure `url`, call `add_rows()` to grow the data it returns, and measure
+        again: both counts must match and stay within `budget`.
+        """
+        before = self.count_queries(url)
+        add_rows()
+        after = self.count_queries(url)
+        self.assertEqual(after, before, f'{url} query count grew with row count')
+        self.assertLessEqual(after, budget, f'{url} ran {after} queries, budget is {budget}')
+
+
+class ProductStockTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Filter', description='', price=10, stock=3)
+
+    def test_sell_returns_new_stock(self):
+        self.assertEqual(self.product.sell(2), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_sell_to_zero(self):
+        self.assertEqual(self.product.sell(3), 0)
+
+    def test_sell_insufficient_stock(self):
+        self.assertIsNone(self.product.sell(4))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_buy_returns_new_stock(self):
+        self.assertEqual(self.product.buy(5), 8)
+
+
+class ProductSellContentionTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('shared-cache in-memory SQLite cannot take concurrent writers')
+
+    def test_concurrent_sells_never_oversell(self):
+        product = Product.objects.create(name='Brake pad', description='', price=10, stock=50)
+
+        def sell(_):
+            try:
+                return Product(pk=product.pk).sell(1) is not None
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            succeeded = sum(pool.map(sell, range(200)))
+
+        product.refresh_from_db()
+        self.assertEqual(succeeded, 50)
+        self.assertEqual(product.stock, 0)
+
+
+class BatchStockAPITests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='clerk', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        self.products = [
+            Product.objects.create(name=f'Part {i}', description='', price=10, stock=5)
+            for i in range(20)
+        ]
+        self.url = reverse('product-batch-stock')
+
+    def test_applies_all_lines(self):
+        lines = [{'product_id': p.pk, 'delta': -2} for p in self.products]
+        lines.append({'product_id': self.products[0].pk, 'delta': 4})
+        response = self.client.post(self.url, lines, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['stock'], 7)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).stock, 3)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 7)
+
+    def test_insufficient_stock_applies_nothing(self):
+        lines = [
+            {'product_id': self.products[0].pk, 'delta': -1},
+            {'product_id': self.products[1].pk, 'delta': -6},
+        ]
+        response = self.client.post(self.url, lines, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][1]['error'], 'Not enough stock')
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 5)
+
+    def test_unknown_product(self):
+        response = self.client.post(self.url, [{'product_id': 999999, 'delta': 1}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['error'], 'Product not found')
+
+    def test_query_count_does_not_grow_with_lines(self):
+        lines = [{'product_id': p.pk, 'delta': -1} for p in self.products]
+        # token lookup, savepoint pair, locking select, update, ledger insert
+        with self.assertNumQueries(6):
+            self.client.post(self.url, lines, format='json')
+
+
+class AdminDashboardAPITests(APITestCase):
+    def setUp(self):
+        admin_dashboard_cache.invalidate()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+        self.product = Product.objects.create(name='Oil', description='', price=10, stock=3)
+        ServiceRequest.objects.create(user=self.admin, product=self.product, status='pending')
+        ServiceRequest.objects.create(user=self.admin, status='in_progress', payment_status='paid')
+        request_status_counts.poll()
+        self.url = reverse('admin-dashboard')
+
+    def test_counts(self):
+        data = self.client.get(self.url).data
+        self.assertEqual(data['total_requests'], 2)
+        self.assertEqual(data['pending_requests'], 1)
+        self.assertEqual(data['in_progress_requests'], 1)
+        self.assertEqual(data['unpaid_requests'], 1)
+        self.assertEqual(len(data['low_stock_products']), 1)
+
+    def test_served_from_cache_until_invalidated(self):
+        misses = admin_dashboard_cache.stats()['misses']
+        self.client.get(self.url)
+        with self.assertNumQueries(0):  # token and payload both cached
+            self.client.get(self.url)
+        self.assertEqual(admin_dashboard_cache.stats()['misses'], misses + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceRequest.objects.create(user=self.admin)
+        self.assertEqual(self.client.get(self.url).data['total_requests'], 2)  # not consumed yet
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('consume_request_events', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data['total_requests'], 3)
+
+    def test_stock_change_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.buy(10)
+        self.assertEqual(self.client.get(self.url).data['low_stock_products'], [])
+
+    def test_seed_and_unseed_leave_counts_unchanged(self):
+        self.assertEqual(self.client.get(self.url).data['total_requests'], 2)
+        seed(users=2, products=3, services=2, requests=20)
+        request_status_counts.poll()
+        admin_dashboard_cache.invalidate()
+        self.assertEqual(self.client.get(self.url).data['total_requests'], 22)
+        unseed()
+        request_status_counts.poll()
+        admin_dashboard_cache.invalidate()
+        self.assertEqual(self.client.get(self.url).data['total_requests'], 2)
+
+
+class UserRequestSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='driver', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def assertCounters(self, active, completed, unpaid):
+        summary = UserRequestSummary.objects.get(pk=self.user.pk)
+        self.assertEqual(
+            (summary.active_requests, summary.completed_requests, summary.pending_payments),
+            (active, completed, unpaid),
+        )
+        self.assertEqual(UserRequestSummary.compute([self.user.pk])[self.user.pk], {
+            'active_requests': active, 'completed_requests': completed, 'pending_payments': unpaid,
+        })
+
+    def test_counters_follow_create_update_and_delete(self):
+        first = ServiceRequest.objects.create(user=self.user)
+        second = ServiceRequest.objects.create(user=self.user)
+        self.assertCounters(2, 0, 2)
+
+        admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        self.client.patch(reverse('request-update-status', args=[first.pk]), {'status': 'in_progress'})
+        self.client.patch(
+            reverse('request-update-status', args=[first.pk]),
+            {'status': 'completed', 'payment_status': 'paid'},
+        )
+        self.assertCounters(1, 1, 1)
+
+        ServiceRequest.objects.get(pk=second.pk).delete()
+        self.assertCounters(0, 1, 0)
+
+    def test_dashboard_uses_summary(self):
+        ServiceRequest.objects.create(user=self.user, status='completed')
+        UserRequestSummary.objects.all().delete()
+        data = self.client.get(reverse('user-dashboard')).data
+        self.assertEqual(data['completed_requests'], 1)
+        self.assertEqual(data['pending_payments'], 1)
+        self.assertEqual(data['active_requests'], 0)
+
+    def test_rebuild_command(self):
+        ServiceRequest.objects.create(user=self.user)
+        UserRequestSummary.objects.filter(pk=self.user.pk).update(active_requests=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_request_summaries', verify=True, stdout=StringIO())
+        call_command('rebuild_request_summaries', stdout=StringIO())
+        self.assertCounters(1, 0, 1)
+
+
+class PriceSnapshotTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='driver', password='pass')
+        self.admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+        self.product = Product.objects.create(name='Pads', description='', price=Decimal('10.00'), stock=5)
+        self.service = CarRepair.objects.create(service_name='Fit', description='', price=Decimal('50.00'))
+
+    def test_status_change_keeps_snapshot_without_catalog_queries(self):
+        request = ServiceRequest.objects.create(
+            user=self.user, product=self.product, car_repair=self.service, quantity=2
+        )
+        self.assertEqual(request.total_price, Decimal('70.00'))
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('99.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(reverse('request-update-status', args=[request.pk]), {'status': 'in_progress'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if 'FROM "products_product"' in q['sql']])
+        request.refresh_from_db()
+        self.assertEqual((request.product_price, request.total_price), (Decimal('10.00'), Decimal('70.00')))
+
+    def test_quantity_change_uses_snapshot(self):
+        request = ServiceRequest.objects.get(pk=ServiceRequest.objects.create(user=self.user, product=self.product).pk)
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('99.00'))
+        request.quantity = 3
+        with CaptureQueriesContext(connection) as queries:
+            request.save(update_fields=['quantity'])
+        self.assertFalse([q for q in queries if 'FROM "products_product"' in q['sql']])
+        request.refresh_from_db()
+        self.assertEqual(request.total_price, Decimal('30.00'))
+
+    def test_reprice_updates_open_unpaid_requests_in_one_update(self):
+        open_request = ServiceRequest.objects.create(
+            user=self.user, product=self.product, car_repair=self.service, quantity=2
+        )
+        paid = ServiceRequest.objects.create(user=self.user, product=self.product, payment_status='paid')
+        closed = ServiceRequest.objects.create(user=self.user, product=self.product, status='cancelled')
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('12.50'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('product-reprice-requests', args=[self.product.pk]))
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "products_servicerequest"')]), 1)
+        totals = dict(ServiceRequest.objects.values_list('pk', 'total_price'))
+        self.assertEqual(totals, {open_request.pk: Decimal('75.00'), paid.pk: Decimal('10.00'), closed.pk: Decimal('10.00')})
+
+        CarRepair.objects.filter(pk=self.service.pk).update(price=Decimal('40.00'))
+        self.client.post(reverse('service-reprice-requests', args=[self.service.pk]))
+        open_request.refresh_from_db()
+        self.assertEqual(open_request.total_price, Decimal('65.00'))
+
+    def test_reprice_bumps_version(self):
+        request = ServiceRequest.objects.get(pk=ServiceRequest.objects.create(user=self.user, product=self.product).pk)
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('12.50'))
+        self.client.post(reverse('product-reprice-requests', args=[self.product.pk]))
+        self.assertEqual(ServiceRequest.objects.get(pk=request.pk).version, 2)
+        self.assertFalse(request.update_if_current({'quantity': 2}))
+        response = self.client.patch(
+            reverse('request-update-status', args=[request.pk]), {'notes': 'x'}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_reprice_is_admin_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        response = self.client.post(reverse('product-reprice-requests', args=[self.product.pk]))
+        self.assertEqual(response.status_code, 403)
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='driver', password='pass')
+        admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        self.product = Product.objects.create(name='Pads', description='', price=Decimal('10.00'), stock=3)
+
+    def create_request(self, quantity=2):
+        return ServiceRequest.objects.create(user=self.owner, product=self.product, quantity=quantity)
+
+    def set_status(self, service_request, new_status):
+        return self.client.patch(reverse('request-update-status', args=[service_request.pk]), {'status': new_status})
+
+    def assertStock(self, stock, reserved):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (stock, reserved))
+
+    def test_creating_a_request_holds_stock(self):
+        service_request = self.create_request()
+        self.assertStock(3, 2)
+        self.assertEqual(self.product.available, 1)
+        self.assertIsNotNone(service_request.reservations.get(status='held').expires_at)
+
+        with self.assertRaises(InsufficientStock):
+            self.create_request()
+        self.assertEqual(ServiceRequest.objects.count(), 1)
+        self.assertIsNone(self.product.sell(2))
+        self.assertEqual(self.product.sell(1), 2)
+        self.assertStock(2, 2)
+
+        response = self.client.get(reverse('product-detail', args=[self.product.pk]))
+        self.assertEqual((response.data['reserved'], response.data['available']), (2, 0))
+        response = self.client.patch(reverse('product-detail', args=[self.product.pk]), {'stock': 1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_completing_sells_and_cancelling_releases(self):
+        done, dropped = self.create_request(quantity=1), self.create_request(quantity=1)
+        self.assertEqual(self.set_status(done, 'in_progress').status_code, 200)
+        self.assertIsNone(done.reservations.get(status='held').expires_at)
+        self.assertEqual(self.set_status(done, 'completed').status_code, 200)
+        self.assertStock(2, 1)
+        self.assertEqual(done.reservations.get().status, 'consumed')
+
+        self.assertEqual(self.set_status(dropped, 'cancelled').status_code, 200)
+        self.assertStock(2, 0)
+        self.assertEqual(dropped.reservations.get().status, 'released')
+
+        # Closed requests don't touch stock again.
+        done = ServiceRequest.objects.get(pk=done.pk)
+        done.quantity = 2
+        done.save()
+        self.assertStock(2, 0)
+
+    def test_quantity_change_moves_the_hold_and_delete_releases_it(self):
+        service_request = self.create_request(quantity=1)
+        service_request.quantity = 3
+        service_request.save()
+        self.assertStock(3, 3)
+        self.assertEqual(list(service_request.reservations.values_list('status', flat=True).order_by('pk')),
+                         ['released', 'held'])
+        service_request.delete()
+        self.assertStock(3, 0)
+
+    def test_saving_a_stale_product_keeps_holds(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        service_request = self.create_request()
+        stale.name = 'Brake pads'
+        stale.save()
+        self.assertEqual(stale.reserved, 2)
+        self.assertStock(3, 2)
+        self.assertEqual(verify(), {})
+        self.client.delete(reverse('product-detail', args=[stale.pk]))
+        self.assertStock(3, 2)
+        self.assertEqual(self.set_status(service_request, 'cancelled').status_code, 200)
+        self.assertStock(3, 0)
+
+    def test_import_cannot_drop_stock_below_reserved(self):
+        Product.objects.filter(pk=self.product.pk).update(sku='PAD-1')
+        self.create_request()
+        report = CatalogImporter('products').run([
+            (2, {'sku': 'PAD-1', 'name': 'Pads', 'price': '10.00', 'stock': '1'}),
+            (3, {'sku': 'PAD-2', 'name': 'Shoes', 'price': '12.00', 'stock': '4'}),
+        ])
+        self.assertEqual((report['upserted'], report['rejected']), (1, 1))
+        self.assertEqual((report['rejects'][0]['line'], list(report['rejects'][0]['errors'])), (2, ['stock']))
+        self.assertStock(3, 2)
+        self.assertEqual(verify(), {})
+
+    def test_sweeper_releases_expired_holds(self):
+        expired = [self.create_request(quantity=1) for _ in range(3)]
+        StockReservation.objects.filter(request__in=expired[:2]).update(expires_at=timezone.now())
+        out = StringIO()
+        call_command('release_expired_reservations', batch_size=1, stdout=out)
+        self.assertIn('Released 2 expired reservations', out.getvalue())
+        self.assertStock(3, 1)
+
+        # An expired request can still complete from available stock, but not
+        # once that is gone.
+        self.assertEqual(self.set_status(expired[0], 'in_progress').status_code, 200)
+        self.assertStock(3, 2)
+        self.assertEqual(self.product.sell(1), 2)
+        self.assertEqual(self.set_status(expired[1], 'in_progress').status_code, 400)
+        expired[1].refresh_from_db()
+        self.assertEqual(expired[1].status, 'pending')
+
+
+class InventoryLedgerTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+        self.product = Product.objects.create(name='Pads', description='', price=Decimal('10.00'), stock=10)
+        self.other = Product.objects.create(name='Discs', description='', price=Decimal('40.00'), stock=4)
+
+    def move_stock(self):
+        self.product.sell(3)
+        self.product.buy(5)
+        Product.adjust_stock({self.product.pk: -2, self.other.pk: 1})
+        service_request = ServiceRequest.objects.create(user=self.admin, product=self.other, quantity=2)
+        service_request.update_if_current({'status': 'in_progress'})
+        service_request.update_if_current({'status': 'completed'})
+        ServiceRequest.objects.create(user=self.admin, product=self.product, quantity=1).delete()
+        self.client.patch(reverse('product-detail', args=[self.product.pk]), {'stock': 20})
+
+    def assertLedgerMatches(self):
+        expected = {pk: (stock, reserved) for pk, stock, reserved in Product.objects.values_list('pk', 'stock', 'reserved')}
+        self.assertEqual(stock_levels(), expected)
+        call_command('compact_inventory', verify=True, stdout=StringIO())
+
+    def test_every_stock_change_is_recorded(self):
+        self.move_stock()
+        self.assertLedgerMatches()
+        kinds = list(InventoryMovement.objects.filter(product_id=self.other.pk).order_by('id').values_list(
+            'kind', 'quantity', 'reserved'))
+        self.assertEqual(kinds, [
+            ('adjustment', 4, 0), ('purchase', 1, 0), ('reservation', 0, 2), ('sale', -2, -2),
+        ])
+
+        response = self.client.get(reverse('product-movements', args=[self.product.pk]))
+        self.assertEqual([movement['kind'] for movement in response.data['results']], [
+            'adjustment', 'sale', 'purchase', 'sale', 'reservation', 'release', 'adjustment',
+        ])
+
+    def test_net_zero_batch_lines_leave_no_movement(self):
+        response = self.client.post(reverse('product-batch-stock'), [
+            {'product_id': self.product.pk, 'delta': 5},
+            {'product_id': self.product.pk, 'delta': -5},
+            {'product_id': self.other.pk, 'delta': -1},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['stock'], 10)
+        self.assertEqual(list(InventoryMovement.objects.filter(product_id=self.product.pk).values_list('kind', flat=True)),
+                         ['adjustment'])
+        self.assertLedgerMatches()
+
+    def test_seeded_open_requests_hold_stock(self):
+        seed(users=2, products=3, services=2, requests=200)
+        held = {
+            row['product']: row['total']
+            for row in StockReservation.objects.filter(status='held').values('product').annotate(total=Sum('quantity'))
+        }
+        self.assertTrue(held)
+        open_requests = ServiceRequest.objects.filter(product__isnull=False).exclude(
+            status__in=ServiceRequest.CLOSED_STATUSES)
+        self.assertEqual(StockReservation.objects.filter(status='held').count(), open_requests.count())
+        for product in Product.objects.filter(name__startswith='seed-'):
+            self.assertEqual(product.reserved, held.get(product.pk, 0))
+            self.assertLessEqual(product.reserved, product.stock)
+        self.assertLedgerMatches()
+
+        unseed()
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertLedgerMatches()
+
+    def test_compaction_rolls_movements_into_snapshots(self):
+        self.move_stock()
+        self.assertEqual(compact(batch_size=1), 2)
+        self.assertEqual(compact(), 0)
+        snapshot = StockSnapshot.objects.filter(product_id=self.product.pk).latest('last_movement_id')
+        self.assertEqual((snapshot.stock, snapshot.reserved), (20, 0))
+
+        # Reads after compaction only look at newer movements.
+        self.product.sell(4)
+        self.assertEqual(stock_levels(Product.objects.filter(pk=self.product.pk)), {self.product.pk: (16, 0)})
+        self.assertLedgerMatches()
+        self.assertEqual(compact(settle=60), 0)
+
+    def test_catalog_import_records_adjustments(self):
+        upload = SimpleUploadedFile('parts.csv', b'sku,name,price,stock\nP-1,Filter,5.00,7\n')
+        self.client.post(reverse('catalog-import'), {'file': upload, 'kind': 'products'})
+        upload = SimpleUploadedFile('parts.csv', b'sku,name,price,stock\nP-1,Filter,5.00,3\n')
+        self.client.post(reverse('catalog-import'), {'file': upload, 'kind': 'products'})
+        imported = Product.objects.get(sku='P-1')
+        self.assertEqual(
+            list(InventoryMovement.objects.filter(product_id=imported.pk).values_list('quantity', flat=True)), [7, -4]
+        )
+        self.assertLedgerMatches()
+
+
+class OptimisticConcurrencyTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='driver', password='pass')
+        admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        product = Product.objects.create(name='Pads', description='', price=Decimal('10.00'), stock=5)
+        self.request = ServiceRequest.objects.create(user=self.owner, product=product, notes='rattle')
+        self.url = reverse('request-update-status', args=[self.request.pk])
+
+    def test_matching_version_writes_changed_fields_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'status': 'in_progress', 'notes': 'rattle'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['version'], response['ETag']), (2, '"2"'))
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "products_servicerequest"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"version" = 1', updates[0].replace('"products_servicerequest".', ''))
+        self.assertNotIn('"notes"', updates[0])
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.status, self.request.version), ('in_progress', 2))
+
+    def test_stale_version_conflicts(self):
+        self.client.patch(self.url, {'status': 'in_progress'}, HTTP_IF_MATCH='"1"')
+        response = self.client.patch(self.url, {'status': 'cancelled'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 409)
+        self.request.refresh_from_db()
+        self.assertEqual((self.request.status, self.request.version), ('in_progress', 2))
+        self.assertEqual(self.client.patch(self.url, {'notes': 'x'}, HTTP_IF_MATCH='nonsense').status_code, 412)
+
+    def test_illegal_transition_is_rejected(self):
+        response = self.client.patch(self.url, {'status': 'completed'})
+        self.assertEqual(response.status_code, 400)
+        self.client.patch(self.url, {'status': 'cancelled'})
+        self.assertEqual(self.client.patch(self.url, {'status': 'pending'}).status_code, 400)
+
+    def test_owner_quantity_change_recomputes_total(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.owner).key}')
+        response = self.client.patch(
+            reverse('request-detail', args=[self.request.pk]), {'quantity': 3}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_price'], response.data['version']), ('30.00', 2))
+
+    def test_etag_from_get_is_accepted_as_if_match(self):
+        url = reverse('request-detail', args=[self.request.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('"1-'))
+        response = self.client.patch(url, {'notes': 'squeal'}, HTTP_IF_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['version']), (200, 2))
+        self.assertEqual(self.client.patch(url, {'notes': 'hum'}, HTTP_IF_MATCH=etag).status_code, 409)
+        self.assertTrue(self.client.get(url)['ETag'].startswith('"2-'))
+
+    def test_plain_save_invalidates_older_if_match(self):
+        url = reverse('request-detail', args=[self.request.pk])
+        etag = self.client.get(url)['ETag']
+        self.request.notes = 'edited in the admin'
+        self.request.save()
+        self.assertEqual(self.request.version, 2)
+        self.request.save(update_fields=['notes'])
+        self.assertEqual(self.request.version, 3)
+
+        self.assertEqual(self.client.patch(url, {'notes': 'hum'}, HTTP_IF_MATCH=etag).status_code, 409)
+        self.assertTrue(self.client.get(url)['ETag'].startswith('"3-'))
+
+
+class ServiceRequestEventTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='driver', password='pass')
+        self.admin = User.objects.create_user(username='boss', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+
+    def history(self, request_id):
+        return list(ServiceRequestEvent.objects.filter(request_id=request_id).order_by('id').values_list(
+            'old_status', 'new_status', 'old_payment_status', 'new_payment_status'
+        ))
+
+    def test_changes_are_logged_with_the_write(self):
+        request = ServiceRequest.objects.create(user=self.user)
+        self.client.patch(reverse('request-update-status', args=[request.pk]), {'status': 'in_progress'})
+        self.client.patch(reverse('request-update-status', args=[request.pk]), {'notes': 'no status change'})
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ServiceRequest.objects.get(pk=request.pk).delete()
+            raise RuntimeError
+        ServiceRequest.objects.get(pk=request.pk).delete()
+        self.assertEqual(self.history(request.pk), [
+            (None, 'pending', None, 'unpaid'),
+            ('pending', 'in_progress', 'unpaid', 'unpaid'),
+            ('in_progress', None, 'unpaid', None),
+        ])
+
+    def test_history_endpoint_is_owner_or_admin(self):
+        request = ServiceRequest.objects.create(user=self.user)
+        response = self.client.get(reverse('request-history', args=[request.pk]))
+        self.assertEqual([event['new_status'] for event in response.data['results']], ['pending'])
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=stranger).key}')
+        self.assertEqual(self.client.get(reverse('request-history', args=[request.pk])).status_code, 403)
+
+    def test_feed_pages_by_cursor(self):
+        for _ in range(5):
+            ServiceRequest.objects.create(user=self.user)
+        response = self.client.get(reverse('request-events'), {'limit': 3})
+        self.assertEqual((len(response.data['events']), response.data['has_more']), (3, True))
+        response = self.client.get(reverse('request-events'), {'after': response.data['cursor']})
+        self.assertEqual((len(response.data['events']), response.data['has_more']), (2, False))
+
+    def test_consumer_reads_each_event_once(self):
+        seen = []
+        consumer = EventConsumer('test', lambda events: seen.extend(event.id for event in events), batch_size=2)
+        for _ in range(3):
+            ServiceRequest.objects.create(user=self.user)
+        self.assertEqual(consumer.poll(), 3)
+        self.assertEqual(consumer.poll(), 0)
+        ServiceRequest.objects.create(user=self.user)
+
+        def fail(events):
+            raise RuntimeError
+        with self.assertRaises(RuntimeError):
+            EventConsumer('test', fail).poll()
+        self.assertEqual(consumer.poll(), 1)
+        self.assertEqual(seen, list(ServiceRequestEvent.objects.order_by('id').values_list('id', flat=True)))
+
+    @override_settings(EVENT_LOG_SETTLE_SECONDS=60)
+    def test_events_committed_out_of_order_are_not_skipped(self):
+        ServiceRequest.objects.create(user=self.user)
+        request_status_counts.poll()
+        position = request_status_counts.position
+
+        def event(offset, **kwargs):
+            ServiceRequestEvent.objects.create(
+                id=position + offset, request_id=0, user_id=self.user.pk,
+                new_status='pending', new_payment_status='unpaid', **kwargs
+            )
+
+        # A later id commits first: readers wait for the missing one.
+        event(2)
+        self.assertEqual(request_status_counts.poll(), 0)
+        feed = self.client.get(reverse('request-events'), {'after': position}).data
+        self.assertEqual((feed['events'], feed['cursor']), ([], position))
+        event(1)
+        self.assertEqual(request_status_counts.poll(), 2)
+        # A gap left by a rollback is skipped once the event after it settles.
+        event(4, created_at=timezone.now() - datetime.timedelta(minutes=5))
+        self.assertEqual(request_status_counts.poll(), 1)
+        self.assertEqual(RequestStatusCount.objects.get(status='pending', payment_status='unpaid').count, 4)
+
+    @override_settings(EVENT_LOG_SETTLE_SECONDS=60)
+    def test_fresh_cursor_waits_for_missing_first_ids(self):
+        def event(event_id, **kwargs):
+            ServiceRequestEvent.objects.create(
+                id=event_id, request_id=0, user_id=self.user.pk,
+                new_status='pending', new_payment_status='unpaid', **kwargs
+            )
+
+        event(2)
+        self.assertEqual(request_status_counts.poll(), 0)
+        self.assertEqual(self.client.get(reverse('request-events')).data['events'], [])
+        event(1)
+        self.assertEqual(request_status_counts.poll(), 2)
+
+    def test_replay_rebuilds_aggregates(self):
+        first = ServiceRequest.objects.create(user=self.user)
+        ServiceRequest.objects.create(user=self.user, payment_status='paid')
+        self.client.patch(reverse('request-update-status', args=[first.pk]), {'status': 'cancelled'})
+        UserRequestSummary.objects.filter(pk=self.user.pk).update(active_requests=9)
+        RequestStatusCount.objects.create(status='pending', payment_status='paid', count=5)
+
+        call_command('replay_request_events', stdout=StringIO())
+        summary = UserRequestSummary.objects.get(pk=self.user.pk)
+        self.assertEqual((summary.active_requests, summary.completed_requests, summary.pending_payments), (1, 0, 1))
+        admin_dashboard_cache.invalidate()
+        data = self.client.get(reverse('admin-dashboard')).data
+        self.assertEqual((data['total_requests'], data['pending_requests'], data['unpaid_requests']), (2, 1, 1))
+
+        call_command('replay_request_events', verify=True, stdout=StringIO())
+        ServiceRequest.objects.filter(pk=first.pk).update(status='completed')  # bypasses the log
+        with self.assertRaises(CommandError):
+            call_command('replay_request_events', verify=True, stdout=StringIO())
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='driver', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        product = Product.objects.create(name='Pads', description='long text ' * 50, price=10, stock=5)
+        for _ in range(3):
+            ServiceRequest.objects.create(user=self.user, product=product)
+
+    def select_sql(self, queries, table):
+        return [q['sql'] for q in queries if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']]
+
+    def test_product_fields_trim_response_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-list-create'), {'fields': 'id,name,price,stock'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price', 'stock'})
+        page_sql = [sql for sql in self.select_sql(queries, 'products_product') if 'LIMIT' in sql]
+        self.assertNotIn('"description"', page_sql[0])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-list-create'), {'exclude': 'description'})
+        self.assertEqual(response.data['results'][0]['available'], 2)
+        self.assertEqual(len(self.select_sql(queries, 'products_product')), 2)  # fingerprint and page
+        page_sql = [sql for sql in self.select_sql(queries, 'products_product') if 'LIMIT' in sql]
+        self.assertNotIn('"description"', page_sql[0])
+
+        response = self.client.get(reverse('service-list-create'), {'exclude': 'description'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('product-detail', args=[Product.objects.get().pk]), {'exclude': 'description'})
+        self.assertNotIn('description', response.data)
+
+    def test_request_fields_skip_joins_and_keep_cursor(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('request-list-create'), {'fields': 'id,status,total_price', 'page_size': 2}
+            )
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status', 'total_price'})
+        page_sql = [sql for sql in self.select_sql(queries, 'products_servicerequest') if 'LIMIT' in sql]
+        self.assertNotIn('JOIN', page_sql[0])
+        self.assertNotIn('"notes"', page_sql[0])
+
+        # Token auth is cached; the next page needs no deferred-field refetches.
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get(reverse('request-list-create'), {'fields': 'id,product'})
+        self.assertEqual(response.data['results'][0]['product'], 'Pads')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('product-list-create'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'fields': ['Unknown field: secret']})
+
+
+class FastJSONTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='driver', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        Product.objects.bulk_create(
+            Product(name=f'Part {i}', description='Brake pads for hatchbacks ' * 4, price='19.99', stock=i)
+            for i in range(40)
+        )
+
+    def test_decimals_and_datetimes_are_exact(self):
+        moment = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        body = FastJSONRenderer().render({'total': Decimal('12345678.91'), 'at': moment, 'codes': {200: 1}})
+        self.assertEqual(
+            json.loads(body), {'total': '12345678.91', 'at': '2024-05-01T12:30:15.123456Z', 'codes': {'200': 1}}
+        )
+
+    def test_parser_decodes_requests(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO('{"name": "Pneu été"}'.encode())), {'name': 'Pneu été'})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"price": NaN}'))
+
+        User.objects.filter(username='driver').update(is_staff=True)
+        token_cache.clear()
+        response = self.client.post(
+            reverse('product-list-create'), '{"name": "Filter", "description": "x", "price": 5.5, "stock": 1}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['price'], '5.50')
+        self.assertEqual(Product.objects.get(name='Filter').price, Decimal('5.50'))
+
+    def test_large_responses_are_gzipped_when_accepted(self):
+        url = reverse('product-list-create')
+        plain = self.client.get(url)
+        self.assertEqual(plain['Content-Type'], 'application/json')
+        self.assertNotIn('Content-Encoding', plain)
+
+        compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertLess(len(compressed.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(compressed.content))['results'], plain.json()['results'])
+
+        small = self.client.get(url, {'fields': 'id', 'page_size': 1}, headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small)
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.cookies = {}
+
+    def reads(self, method='get', write=False):
+        """
+        Aliases the router picks for reads during a request, before and after
+        an optional write. Cookies the response sets are sent on later requests.
+        """
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Product))
+            if write:
+                self.router.db_for_write(Product)
+                seen.append(self.router.db_for_read(Product))
+            return HttpResponse()
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(self.cookies)
+        response = ReplicaRoutingMiddleware(view)(request)
+        self.cookies.update({name: morsel.value for name, morsel in response.cookies.items()})
+        return seen
+
+    def test_safe_methods_read_from_replica(self):
+        self.assertEqual(self.reads('get'), ['replica'])
+        self.assertEqual(self.reads('post'), [None])
+        self.assertIsNone(self.router.db_for_read(Product))
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(self.reads('get'), [None])
+
+    def test_reads_after_a_write_stick_to_primary(self):
+        self.assertEqual(self.reads('post', write=True), [None, None])
+        self.assertEqual(self.reads('get'), [None])
+        self.cookies = {}  # another client
+        self.assertEqual(self.reads('get'), ['replica'])
+
+    def test_sticky_cookie_expires_and_cannot_be_forged(self):
+        self.reads('post', write=True)
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(self.reads('get'), ['replica'])
+        self.cookies = {ReplicaRoutingMiddleware.cookie_name: '1'}
+        self.assertEqual(self.reads('get'), ['replica'])
+
+    def test_writes_during_a_get_do_not_pin_the_client(self):
+        self.assertEqual(self.reads('get', write=True), ['replica', None])
+        self.assertEqual(self.cookies, {})
+        self.assertEqual(self.reads('get'), ['replica'])
+
+    def test_use_primary(self):
+        with route_request('replica'):
+            with use_primary():
+                self.assertIsNone(self.router.db_for_read(Product))
+            self.assertEqual(self.router.db_for_read(Product), 'replica')
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.add_rows()
+
+    def add_rows(self):
+        for i in range(5):
+            owner = User.objects.create_user(username=f'owner-{self.user.pk}-{User.objects.count()}')
+            # Each request holds one unit of its product.
+            product = Product.objects.create(name='Part', description='', price=10, stock=i + 2)
+            repair = CarRepair.objects.create(service_name='Service', description='', price=20)
+            ServiceRequest.objects.create(user=owner, product=product, car_repair=repair)
+            ServiceRequest.objects.create(user=self.user, product=product, car_repair=repair)
+
+    # Lists: token, ETag aggregate, page.
+    def test_request_list(self):
+        self.assertQueryBudget(reverse('request-list-create'), 3, self.add_rows)
+
+    def test_request_detail(self):
+        url = reverse('request-detail', args=[ServiceRequest.objects.first().pk])
+        self.assertQueryBudget(url, 2, self.add_rows)
+
+    def test_product_and_service_lists(self):
+        self.assertQueryBudget(reverse('product-list-create'), 3, self.add_rows)
+        self.assertQueryBudget(reverse('service-list-create'), 3, self.add_rows)
+
+    def test_user_dashboard(self):
+        self.assertQueryBudget(reverse('user-dashboard'), 3, self.add_rows)
+
+    def test_admin_dashboard(self):
+        # Measure the steady state, with the status counts caught up with the
+        # event log; catching up costs a few queries per batch of new events.
+        def add_rows():
+            self.add_rows()
+            request_status_counts.poll()
+        request_status_counts.poll()
+        self.assertQueryBudget(reverse('admin-dashboard'), 6, add_rows)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='staff', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        cheap = Product.objects.create(name='Bulb', description='', price=5, stock=100)
+        dear = Product.objects.create(name='Gearbox', description='', price=500, stock=100)
+        for i in range(25):
+            ServiceRequest.objects.create(user=self.user, product=dear if i % 3 else cheap)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_cursor_walk_visits_every_row_once(self):
+        ids, pages = self.walk(reverse('request-list-create') + '?page_size=7')
+        self.assertEqual(pages, 4)
+        self.assertEqual(ids, list(ServiceRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_cursor_walk_with_tied_ordering_field(self):
+        ids, _ = self.walk(reverse('request-list-create') + '?ordering=total_price&page_size=4')
+        self.assertEqual(ids, list(ServiceRequest.objects.order_by('total_price', 'id').values_list('id', flat=True)))
+
+    def test_offset_mode_reports_count(self):
+        response = self.client.get(reverse('request-list-create') + '?mode=offset&page=2&page_size=10')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('product-list-create') + '?cursor=nope')
+        self.assertEqual(response.status_code, 404)
+
+    def test_services_page_on_created_at(self):
+        for i in range(5):
+            CarRepair.objects.create(service_name=f'Service {i}', description='', price=20)
+        with CaptureQueriesContext(connection) as queries:
+            ids, _ = self.walk(reverse('service-list-create') + '?page_size=2')
+        self.assertEqual(ids, list(CarRepair.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        page = queries.captured_queries[-1]['sql']
+        self.assertIn('ORDER BY "products_carrepair"."created_at" DESC, "products_carrepair"."id" DESC', page)
+
+
+class CatalogSearchTests(APITestCase):
+    def setUp(self):
+        Product.objects.create(name='Brake pad', description='Front axle, ceramic', price=40, stock=10)
+        Product.objects.create(name='Wiper blade', description='Fits most brake-light models', price=8, stock=10)
+        Product.objects.create(name='Oil filter', description='Synthetic oil compatible', price=12, stock=10)
+        CarRepair.objects.create(service_name='Brake inspection', description='Pads and discs', price=30)
+        self.url = reverse('product-list-create')
+
+    def names(self, url, search):
+        return [row.get('name') or row.get('service_name') for row in self.client.get(url, {'search': search}).data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.names(self.url, 'brake'), ['Brake pad', 'Wiper blade'])
+
+    def test_prefix_match_for_typeahead(self):
+        self.assertEqual(self.names(self.url, 'filt'), ['Oil filter'])
+        self.assertEqual(self.names(self.url, 'synthetic fil'), ['Oil filter'])
+
+    def test_index_follows_updates(self):
+        Product.objects.filter(name='Oil filter').update(name='Air filter')
+        product = Product.objects.get(name='Wiper blade')
+        product.description = 'Rubber'
+        product.save()
+        self.assertEqual(self.names(self.url, 'brake'), ['Brake pad'])
+        self.assertEqual(self.names(self.url, 'air'), ['Air filter'])
+
+    def test_services(self):
+        self.assertEqual(self.names(reverse('service-list-create'), 'disc'), ['Brake inspection'])
+
+
+class ServiceRequestExportTests(APITestCase):
+    # Raise with EXPORT_TEST_ROWS=1000000 to check the ceiling at full scale.
+    rows = int(os.environ.get('EXPORT_TEST_ROWS', 20000))
+    memory_ceiling = 8 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='accounts', password='pass', is_staff=True)
+        cls.product = Product.objects.create(name='Battery', description='', price='99.95', stock=1)
+        ServiceRequest.objects.bulk_create(
+            [
+                ServiceRequest(
+                    user=cls.staff, product=cls.product, quantity=1, total_price='99.95',
+                    status='completed' if i % 2 else 'pending', notes=f'job, "{i}"',
+                )
+                for i in range(cls.rows)
+            ],
+            batch_size=5000,
+        )
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.staff).key}')
+        self.url = reverse('request-export')
+
+    def test_csv_with_filters(self):
+        response = self.client.get(self.url, {'format': 'csv', 'status': 'completed'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,user,product,car_repair,quantity,status,payment_status,'
+                                   'total_price,created_at,updated_at,notes')
+        self.assertEqual(len(lines), self.rows // 2 + 1)
+        self.assertIn('accounts,Battery,,1,completed,unpaid,99.95,', lines[1])
+
+    def test_ndjson(self):
+        response = self.client.get(self.url, {'format': 'ndjson', 'created_before': '2000-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        response = self.client.get(self.url, HTTP_ACCEPT='application/x-ndjson')
+        first = json.loads(next(iter(response.streaming_content)))
+        response.close()
+        self.assertEqual(first['total_price'], '99.95')
+
+    def test_memory_stays_flat(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in response.streaming_content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, self.rows + 1)
+        self.assertLess(peak, self.memory_ceiling)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_requests', format='ndjson', status='pending', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), self.rows // 2)
+
+
+class CatalogImportTests(APITestCase):
+    csv_rows = (
+        'sku,name,description,price,stock\n'
+        'BP-1,Brake pad,Front,40.00,10\n'
+        'OF-2,Oil filter,,12.50,3\n'
+        'XX-3,Broken,,not-a-price,1\n'
+        'BP-1,Brake pad (ceramic),Front,42.00,12\n'
+    )
+
+    def write_file(self, content, suffix='.csv'):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as f:
+            f.write(content)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def test_command_upserts_and_reports_rejects(self):
+        Product.objects.create(sku='OF-2', name='Old filter', description='', price=1, stock=99)
+        path = self.write_file(self.csv_rows)
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', path, chunk_size=2, stdout=out, stderr=err)
+        self.assertIn('4 rows processed, 3 upserted, 1 rejected', out.getvalue())
+        self.assertIn('line 4', err.getvalue())
+        self.assertEqual(Product.objects.get(sku='BP-1').name, 'Brake pad (ceramic)')
+        self.assertEqual(Product.objects.get(sku='OF-2').price, 12.5)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_price_list_without_stock_keeps_stock(self):
+        Product.objects.create(sku='BP-1', name='Brake pad', description='', price=1, stock=7)
+        path = self.write_file('{"sku": "BP-1", "name": "Brake pad", "price": "45.00"}\n', suffix='.jsonl')
+        call_command('import_catalog', path, stdout=StringIO())
+        product = Product.objects.get(sku='BP-1')
+        self.assertEqual((product.price, product.stock), (45, 7))
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write_file(self.csv_rows)
+        with open(f'{path}.checkpoint', 'w') as f:
+            json.dump({'processed': 2}, f)
+        call_command('import_catalog', path, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['BP-1'])
+
+    def test_upload_endpoint_is_admin_only(self):
+        staff = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        clerk = User.objects.create_user(username='clerk', password='pass')
+        upload = SimpleUploadedFile(
+            'services.jsonl', b'{"code": "S1", "service_name": "Tyre rotation", "price": "25.00"}\n'
+        )
+        url = reverse('catalog-import')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=clerk).key}')
+        self.assertEqual(self.client.post(url, {'file': upload, 'kind': 'services'}).status_code, 403)
+
+        upload.seek(0)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=staff).key}')
+        response = self.client.post(url, {'file': upload, 'kind': 'services'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['upserted'], 1)
+        search = self.client.get(reverse('service-list-create'), {'search': 'tyre'})
+        self.assertEqual(search.data['results'][0]['code'], 'S1')
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pos', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.product = Product.objects.create(name='Spark plug', description='', price=5, stock=40)
+
+    def assertRevalidates(self, url, change, detail=False):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # Lists are validated by ETag alone.
+        self.assertEqual('Last-Modified' in response, detail)
+
+        with self.assertNumQueries(1):  # the fingerprint only; token is cached
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_list(self):
+        self.assertRevalidates(reverse('product-list-create'), lambda: self.product.sell(1))
+
+    def test_product_detail(self):
+        def rename():
+            self.product.name = 'Glow plug'
+            self.product.save()
+        self.assertRevalidates(reverse('product-detail', args=[self.product.pk]), rename, detail=True)
+
+    def test_service_list_sees_new_rows(self):
+        CarRepair.objects.create(service_name='Tune-up', description='', price=80)
+        self.assertRevalidates(
+            reverse('service-list-create'),
+            lambda: CarRepair.objects.create(service_name='Alignment', description='', price=50),
+        )
+
+    def test_own_request_list(self):
+        request = ServiceRequest.objects.create(user=self.user, product=self.product)
+
+        def update():
+            request.notes = 'Customer waiting'
+            request.save()
+        self.assertRevalidates(reverse('request-list-create'), update)
+
+    def test_deletes_invalidate_lists(self):
+        older = Product.objects.create(name='Wiper', description='', price=8, stock=10)
+        Product.objects.filter(pk=older.pk).update(updated_at=timezone.now() - datetime.timedelta(days=1))
+        ServiceRequest.objects.create(user=self.user)
+        ServiceRequest.objects.create(user=self.user)
+        for url, delete in [
+            (reverse('product-list-create'), lambda: Product.objects.filter(pk=older.pk).update(is_active=False)),
+            (reverse('request-list-create'), lambda: ServiceRequest.objects.order_by('pk').first().delete()),
+        ]:
+            response = self.client.get(url)
+            etag = response['ETag']
+            since = http_date(time.time() + 60)
+            delete()
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_replaced_row_changes_list_etag(self):
+        request = ServiceRequest.objects.create(user=self.user)
+        url = reverse('request-list-create')
+        etag = self.client.get(url)['ETag']
+        stamp = ServiceRequest.objects.get(pk=request.pk).updated_at
+        request.delete()
+        replacement = ServiceRequest.objects.create(user=self.user)
+        ServiceRequest.objects.filter(pk=replacement.pk).update(updated_at=stamp)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_request_etags_follow_related_names(self):
+        request = ServiceRequest.objects.create(user=self.user, product=self.product)
+
+        def rename():
+            self.product.name = 'Glow plug'
+            self.product.save()
+        self.assertRevalidates(reverse('request-list-create'), rename)
+
+        def rename_user():
+            self.user.username = 'pos-2'
+            self.user.save()
+        self.assertRevalidates(reverse('request-detail', args=[request.pk]), rename_user, detail=True)
+
+
+class AsyncDashboardFixture:
+    def setUp(self):
+        token_cache.clear()
+        admin_dashboard_cache.invalidate()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.driver = User.objects.create_user(username='driver', password='pass')
+        self.admin_token = Token.objects.create(user=self.admin).key
+        self.driver_token = Token.objects.create(user=self.driver).key
+        product = Product.objects.create(name='Fan belt', description='', price=15, stock=2)
+        ServiceRequest.objects.create(user=self.driver, product=product)
+        ServiceRequest.objects.create(user=self.driver, status='completed', payment_status='paid')
+        request_status_counts.poll()
+
+
+class AsyncDashboardTests(AsyncDashboardFixture, TransactionTestCase):
+    reset_sequences = True  # event ids start at 1, as a fresh consumer expects
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('worker threads need their own connection to the test database')
+        super().setUp()
+
+    async def test_admin_dashboard_matches_sync_view(self):
+        auth = f'Token {self.admin_token}'
+        response = await self.async_client.get(reverse('admin-dashboard-async'), headers={'Authorization': auth})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_requests'], 2)
+        self.assertEqual(data['pending_requests'], 1)
+        self.assertEqual(data['low_stock_products'][0]['name'], 'Fan belt')
+
+        await sync_to_async(admin_dashboard_cache.invalidate)()
+        sync_data = (await sync_to_async(self.client.get)(reverse('admin-dashboard'), headers={'Authorization': auth})).json()
+        self.assertEqual(sync_data, data)
+
+    async def test_user_dashboard(self):
+        response = await self.async_client.get(
+            reverse('user-dashboard-async'), headers={'Authorization': f'Token {self.driver_token}'}
+        )
+        data = response.json()
+        self.assertEqual((data['active_requests'], data['completed_requests'], data['pending_payments']), (1, 1, 1))
+        self.assertEqual(len(data['recent_requests']), 2)
+
+    async def test_permissions(self):
+        url = reverse('admin-dashboard-async')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        self.assertEqual((await self.async_client.get(url, headers={'Authorization': 'Token bogus'})).status_code, 401)
+        response = await self.async_client.get(url, headers={'Authorization': f'Token {self.driver_token}'})
+        self.assertEqual(response.status_code, 403)
+
+
+class QueryPoolTests(SimpleTestCase):
+    @override_settings(ASYNC_QUERY_WORKERS=2)
+    def test_calls_share_a_bounded_pool_and_are_recorded(self):
+        recorder = QueryRecorder()
+        token = current_query_recorder.set(recorder)
+        self.addCleanup(current_query_recorder.reset, token)
+        self.addCleanup(setattr, async_views, '_executor', None)
+        async_views._executor = None
+
+        def probe():
+            return threading.current_thread().name, recorder in connection.execute_wrappers
+
+        async def fan_out():
+            return await asyncio.gather(*(run_in_thread(probe) for _ in range(20)))
+        results = asyncio.run(fan_out())
+        self.assertLessEqual(len({name for name, _ in results}), 2)
+        self.assertTrue(all(recorded for _, recorded in results))
+        async_views._executor.shutdown()
+
+
+async def run_inline(func, *args):
+    return await sync_to_async(func)(*args)
+
+
+@mock.patch('products.async_views.run_in_thread', run_inline)
+class AsyncDashboardInlineTests(AsyncDashboardFixture, APITestCase):
+    """
+    The gather path with every query on the test's own connection, so it
+    also runs where worker threads can't see the test database.
+    """
+    async def test_payloads_match_sync_views(self):
+        for name, token in [('admin-dashboard', self.admin_token), ('user-dashboard', self.driver_token)]:
+            auth = {'Authorization': f'Token {token}'}
+            await sync_to_async(admin_dashboard_cache.invalidate)()
+            response = await self.async_client.get(reverse(f'{name}-async'), headers=auth)
+            self.assertEqual(response.status_code, 200)
+            await sync_to_async(admin_dashboard_cache.invalidate)()
+            sync_response = await sync_to_async(self.client.get)(reverse(name), headers=auth)
+            self.assertEqual(response.json(), sync_response.json())
+
+    async def test_permissions(self):
+        url = reverse('admin-dashboard-async')
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+        response = await self.async_client.get(url, headers={'Authorization': f'Token {self.driver_token}'})
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(
+            reverse('user-dashboard-async'), headers={'Authorization': f'Token {self.driver_token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = User.objects.create_user(username='ops', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.admin).key}')
+        Product.objects.create(name='Horn', description='', price=20, stock=3)
+
+    def test_records_per_view_metrics(self):
+        self.client.get(reverse('product-list-create'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        labels = 'view="product-list-create",method="GET",status="2xx"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 1', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertRegex(body, rf'http_request_db_queries_total{{{labels}}} [1-9]')
+        self.assertRegex(body, rf'http_request_render_seconds_total{{{labels}}} \d')
+        self.assertRegex(body, r'db_queries_total{database="default"} [1-9]')
+        self.assertIn('cache_hits_total{cache="token"}', body)
+
+    def test_cache_and_hash_pool_counters_are_typed(self):
+        body = self.client.get(reverse('metrics')).content.decode()
+        for name in ('cache_hits_total', 'cache_misses_total',
+                     'password_hash_completed_total', 'password_hash_rejected_total'):
+            self.assertIn(f'# TYPE {name} counter', body)
+
+    def test_admin_only(self):
+        clerk = User.objects.create_user(username='clerk', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=clerk).key}')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('products.slow_requests', level='WARNING') as logs:
+            self.client.get(reverse('product-list-create'))
+        self.assertIn('products_product', logs.output[0])
+
+
+class LoadTestScenarioTests(APITestCase):
+    def test_every_scenario_succeeds(self):
+        seed(users=3, products=10, services=3, requests=20)
+        fixture = Fixture()
+        for name in SCENARIOS:
+            with self.subTest(scenario=name):
+                result = run_scenario(name, fixture, requests=2, concurrency=1)
+                self.assertEqual(result['requests'], 2)
+                self.assertTrue(all(code.startswith('2') for code in result['status_codes']), result)
+                if name != 'admin_dashboard':  # may be served from cache
+                    self.assertGreater(result['queries_per_request'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
@@ -1,23 +1,40 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Product URLs
     path('products/', views.ProductListCreateAPIView.as_view(), name='product-list-create'),
+    path('products/batch-stock/', views.BatchStockAPIView.as_view(), name='product-batch-stock'),
     path('products/<int:pk>/', views.ProductRetrieveUpdateDestroyAPIView.as_view(), name='product-detail'),
     path('products/<int:pk>/sell/', views.SellProductAPIView.as_view(), name='product-sell'),
     path('products/<int:pk>/buy/', views.BuyProductAPIView.as_view(), name='product-buy'),
+    path('products/<int:pk>/reprice-requests/', views.ProductRepriceRequestsAPIView.as_view(), name='product-reprice-requests'),
+    path('products/<int:pk>/movements/', views.ProductMovementsAPIView.as_view(), name='product-movements'),
 
     # Car Repair URLs
     path('services/', views.CarRepairListCreateAPIView.as_view(), name='service-list-create'),
     path('services/<int:pk>/', views.CarRepairRetrieveUpdateDestroyAPIView.as_view(), name='service-detail'),
+    path('services/<int:pk>/reprice-requests/', views.CarRepairRepriceRequestsAPIView.as_view(), name='service-reprice-requests'),
+
+    # Catalog import
+    path('catalog/import/', views.CatalogImportAPIView.as_view(), name='catalog-import'),
 
     # Service Request URLs
     path('requests/', views.ServiceRequestListCreateAPIView.as_view(), name='request-list-create'),
+    path('requests/export/', views.ServiceRequestExportAPIView.as_view(), name='request-export'),
     path('requests/<int:pk>/', views.ServiceRequestRetrieveUpdateDestroyAPIView.as_view(), name='request-detail'),
     path('requests/<int:pk>/update-status/', views.UpdateServiceStatusAPIView.as_view(), name='request-update-status'),
+    path('requests/<int:pk>/history/', views.ServiceRequestHistoryAPIView.as_view(), name='request-history'),
+    path('requests/events/', views.ServiceRequestEventFeedAPIView.as_view(), name='request-events'),
 
     # Dashboard URLs
     path('dashboard/user/', views.UserDashboardAPIView.as_view(), name='user-dashboard'),
     path('dashboard/admin/', views.AdminDashboardAPIView.as_view(), name='admin-dashboard'),
+
+    # Monitoring
+    path('metrics/', views.MetricsAPIView.as_view(), name='metrics'),
+
+    # Async dashboards for ASGI deployments
+    path('async/dashboard/user/', async_views.AsyncUserDashboardView.as_view(), name='user-dashboard-async'),
+    path('async/dashboard/admin/', async_views.AsyncAdminDashboardView.as_view(), name='admin-dashboard-async'),
 ]
\ No newline at end of file
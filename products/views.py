@@ -1,37 +1,55 @@
 from rest_framework import generics, status, filters
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from rest_framework.authentication import TokenAuthentication
+from users.authentication import CachedTokenAuthentication
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Product, CarRepair, ServiceRequest
+from .models import (
+    Product, CarRepair, ServiceRequest, ServiceRequestEvent, RequestStatusCount, UserRequestSummary, InventoryMovement,
+)
 from .serializers import (
     ProductSerializer,
     SellProductSerializer,
     BuyProductSerializer,
+    StockLineSerializer,
+    CatalogImportSerializer,
     CarRepairSerializer,
     ServiceRequestSerializer,
-    ServiceRequestUpdateSerializer
+    ServiceRequestUpdateSerializer,
+    ServiceRequestEventSerializer,
+    InventoryMovementSerializer
 )
 from .permissions import IsOwnerOrAdmin, IsAdminOrReadOnly
+from .cache import admin_dashboard_cache
+from .search import FullTextSearchFilter
+from .export import EXPORT_FORMATS, export_rows
+from .filters import ServiceRequestExportFilter
+from .renderers import CSVRenderer, NDJSONRenderer
+from .importer import CatalogImporter, guess_format, open_upload, read_rows
+from .mixins import ConditionalGetMixin, SparseQuerysetMixin, VersionedUpdateMixin
+from .metrics import registry
+from .events import read_events, settle_seconds
 
 # Product Views
-class ProductListCreateAPIView(generics.ListCreateAPIView):
+class ProductListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['name', 'description']
 
     def perform_create(self, serializer):
         serializer.save()
 
-class ProductRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ProductRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAdminOrReadOnly]
 
     def perform_destroy(self, instance):
@@ -41,17 +59,18 @@ class ProductRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
 # Product Operations
 class SellProductAPIView(generics.UpdateAPIView):
     serializer_class = SellProductSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, pk):
         try:
-            product = Product.objects.get(pk=pk, is_active=True)
+            product = Product.objects.only('id').get(pk=pk, is_active=True)
             serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 quantity = serializer.validated_data["quantity"]
-                if product.sell(quantity):
-                    return Response({"message": f"Sold {quantity} items"}, status=status.HTTP_200_OK)
+                stock = product.sell(quantity)
+                if stock is not None:
+                    return Response({"message": f"Sold {quantity} items", "stock": stock}, status=status.HTTP_200_OK)
                 return Response({"error": "Not enough stock"}, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Product.DoesNotExist:
@@ -59,44 +78,135 @@ class SellProductAPIView(generics.UpdateAPIView):
 
 class BuyProductAPIView(generics.UpdateAPIView):
     serializer_class = BuyProductSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, pk):
         try:
-            product = Product.objects.get(pk=pk, is_active=True)
+            product = Product.objects.only('id').get(pk=pk, is_active=True)
             serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
                 quantity = serializer.validated_data["quantity"]
-                product.buy(quantity)
-                return Response({"message": f"Added {quantity} items to stock"}, status=status.HTTP_200_OK)
+                stock = product.buy(quantity)
+                return Response({"message": f"Added {quantity} items to stock", "stock": stock}, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
 
+class BatchStockAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = StockLineSerializer(data=request.data, many=True, allow_empty=False)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        deltas = {}
+        for line in serializer.validated_data:
+            deltas[line["product_id"]] = deltas.get(line["product_id"], 0) + line["delta"]
+        stock, errors = Product.adjust_stock(deltas)
+
+        results = []
+        for line in serializer.validated_data:
+            result = {"product_id": line["product_id"], "delta": line["delta"]}
+            if line["product_id"] in errors:
+                result["error"] = errors[line["product_id"]]
+            else:
+                result["stock"] = stock.get(line["product_id"])
+            results.append(result)
+        if errors:
+            return Response({"error": "No changes applied", "results": results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+class ProductRepriceRequestsAPIView(APIView):
+    """
+    Move open, unpaid service requests for a product onto its current price.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, pk):
+        try:
+            product = Product.objects.only('id', 'price').get(pk=pk)
+        except Product.DoesNotExist:
+            return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        updated = ServiceRequest.reprice(product=product)
+        return Response({"message": f"Repriced {updated} requests", "updated": updated}, status=status.HTTP_200_OK)
+
+class ProductMovementsAPIView(generics.ListAPIView):
+    """
+    Inventory ledger of one product: every stock and reservation movement, oldest first.
+    """
+    serializer_class = InventoryMovementSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'id'
+
+    def get_queryset(self):
+        product = get_object_or_404(Product.objects.only('id'), pk=self.kwargs['pk'])
+        return InventoryMovement.objects.filter(product_id=product.pk)
+
 # Car Repair Views
-class CarRepairListCreateAPIView(generics.ListCreateAPIView):
+class CarRepairListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = CarRepair.objects.filter(is_active=True)
     serializer_class = CarRepairSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     search_fields = ['service_name', 'description']
+    # Newest first, paged on (created_at, id): carrepair_active_created_idx.
+    ordering = '-created_at'
 
-class CarRepairRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class CarRepairRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = CarRepair.objects.all()
     serializer_class = CarRepairSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAdminOrReadOnly]
 
     def perform_destroy(self, instance):
         instance.is_active = False
         instance.save()
 
+class CarRepairRepriceRequestsAPIView(APIView):
+    """
+    Move open, unpaid service requests for a service onto its current price.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, pk):
+        try:
+            car_repair = CarRepair.objects.only('id', 'price').get(pk=pk)
+        except CarRepair.DoesNotExist:
+            return Response({"error": "Service not found"}, status=status.HTTP_404_NOT_FOUND)
+        updated = ServiceRequest.reprice(car_repair=car_repair)
+        return Response({"message": f"Repriced {updated} requests", "updated": updated}, status=status.HTTP_200_OK)
+
+class CatalogImportAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        serializer = CatalogImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        upload = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get("format") or guess_format(upload.name)
+        importer = CatalogImporter(serializer.validated_data["kind"])
+        # A failed upload can be re-sent with resume_from set to the last reported "processed".
+        report = importer.run(
+            read_rows(open_upload(upload), file_format),
+            skip=serializer.validated_data["resume_from"],
+        )
+        return Response(report, status=status.HTTP_200_OK)
+
 # Service Request Views
-class ServiceRequestListCreateAPIView(generics.ListCreateAPIView):
+class ServiceRequestListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ServiceRequestSerializer
-    authentication_classes = [TokenAuthentication]
+    etag_related = ['user', 'product', 'car_repair']
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status']
@@ -105,80 +215,168 @@ class ServiceRequestListCreateAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return ServiceRequest.objects.all()
-        return ServiceRequest.objects.filter(user=user)
+            return ServiceRequest.objects.with_related()
+        return ServiceRequest.objects.with_related().filter(user=user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class ServiceRequestRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceRequestRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, VersionedUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ServiceRequestSerializer
-    queryset = ServiceRequest.objects.all()
-    authentication_classes = [TokenAuthentication]
+    queryset = ServiceRequest.objects.with_related()
+    etag_related = ['user', 'product', 'car_repair']
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
 
-class UpdateServiceStatusAPIView(generics.UpdateAPIView):
+class ServiceRequestExportAPIView(generics.GenericAPIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ServiceRequestExportFilter
+    pagination_class = None
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return ServiceRequest.objects.all()
+        return ServiceRequest.objects.filter(user=user)
+
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        rows = export_rows(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(
+            EXPORT_FORMATS[export_format](rows),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="service-requests.{export_format}"'
+        return response
+
+class UpdateServiceStatusAPIView(VersionedUpdateMixin, generics.UpdateAPIView):
     serializer_class = ServiceRequestUpdateSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     queryset = ServiceRequest.objects.all()
 
     def update(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        return Response(serializer.data)
+        # Status updates are always partial, whether sent as PUT or PATCH.
+        kwargs['partial'] = True
+        return super().update(request, *args, **kwargs)
+
+class ServiceRequestHistoryAPIView(generics.ListAPIView):
+    """
+    Status and payment status changes of one service request, oldest first.
+    """
+    serializer_class = ServiceRequestEventSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+    ordering = 'id'
+
+    def get_queryset(self):
+        service_request = get_object_or_404(ServiceRequest.objects.only('id', 'user_id'), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, service_request)
+        return ServiceRequestEvent.objects.filter(request_id=service_request.pk)
+
+# Event Log
+class ServiceRequestEventFeedAPIView(APIView):
+    """
+    The service request event log for downstream consumers: `?after=<id>`
+    returns up to `limit` (default 500, at most 1000) newer events, oldest
+    first, and the cursor to pass as `after` next time. Events behind a gap
+    in the log wait for it to settle, so the cursor never skips one.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            after = max(int(request.query_params.get("after", 0)), 0)
+            limit = min(max(int(request.query_params.get("limit", 500)), 1), 1000)
+        except ValueError:
+            return Response({"error": "after and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        events = read_events(after, limit + 1, settle_seconds())
+        return Response({
+            "events": ServiceRequestEventSerializer(events[:limit], many=True).data,
+            "cursor": events[:limit][-1].id if events else after,
+            "has_more": len(events) > limit,
+        })
 
 # Dashboard Views
 class UserDashboardAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
-        data = {
-            'active_requests': ServiceRequest.objects.filter(
-                user=user
-            ).exclude(status__in=['completed', 'cancelled']).count(),
-            'completed_requests': ServiceRequest.objects.filter(
-                user=user,
-                status='completed'
-            ).count(),
-            'pending_payments': ServiceRequest.objects.filter(
-                user=user,
-                payment_status='unpaid'
-            ).count(),
-            'recent_requests': ServiceRequestSerializer(
-                ServiceRequest.objects.filter(user=user).order_by('-created_at')[:5],
-                many=True
-            ).data
+        return Response({**self.get_counts(user), 'recent_requests': self.get_recent_requests(user)})
+
+    # The parts below are independent so the async view can run them concurrently.
+    @staticmethod
+    def get_counts(user):
+        summary = UserRequestSummary.for_user(user)
+        return {
+            'active_requests': summary.active_requests,
+            'completed_requests': summary.completed_requests,
+            'pending_payments': summary.pending_payments,
         }
-        return Response(data)
+
+    @staticmethod
+    def get_recent_requests(user):
+        return ServiceRequestSerializer(
+            ServiceRequest.objects.with_related().filter(user=user).order_by('-created_at')[:5],
+            many=True
+        ).data
 
 class AdminDashboardAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request):
-        data = {
-            'total_requests': ServiceRequest.objects.count(),
-            'pending_requests': ServiceRequest.objects.filter(
-                status='pending'
-            ).count(),
-            'in_progress_requests': ServiceRequest.objects.filter(
-                status='in_progress'
-            ).count(),
-            'unpaid_requests': ServiceRequest.objects.filter(
-                payment_status='unpaid'
-            ).count(),
-            'recent_requests': ServiceRequestSerializer(
-                ServiceRequest.objects.all().order_by('-created_at')[:10],
-                many=True
-            ).data,
-            'low_stock_products': ProductSerializer(
-                Product.objects.filter(stock__lt=5, is_active=True),
-                many=True
-            ).data
+        return Response(admin_dashboard_cache.get_or_build(self.build_payload))
+
+    @classmethod
+    def build_payload(cls):
+        return {
+            **cls.get_counts(),
+            'recent_requests': cls.get_recent_requests(),
+            'low_stock_products': cls.get_low_stock_products(),
         }
-        return Response(data)
\ No newline at end of file
+
+    # The parts below are independent so the async view can run them concurrently.
+    @staticmethod
+    def get_counts():
+        # Read the status counts the consume_request_events worker keeps up
+        # with the event log instead of counting the whole request table.
+        counts = dict.fromkeys(['total_requests', 'pending_requests', 'in_progress_requests', 'unpaid_requests'], 0)
+        for request_status, payment_status, count in RequestStatusCount.objects.values_list(
+            'status', 'payment_status', 'count'
+        ):
+            counts['total_requests'] += count
+            if request_status in ('pending', 'in_progress'):
+                counts[f'{request_status}_requests'] += count
+            if payment_status == 'unpaid':
+                counts['unpaid_requests'] += count
+        return counts
+
+    @staticmethod
+    def get_recent_requests():
+        return ServiceRequestSerializer(
+            ServiceRequest.objects.with_related().order_by('-created_at')[:10],
+            many=True
+        ).data
+
+    @staticmethod
+    def get_low_stock_products():
+        return ProductSerializer(
+            Product.objects.filter(stock__lt=5, is_active=True),
+            many=True
+        ).data
+
+
+# Monitoring
+class MetricsAPIView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,114 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from products.routers import reading_from_replica, use_primary
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of token key -> (user, token) with a time-to-live.
+
+    Entries are dropped by the receivers in users/signals.py when a token is
+    deleted or regenerated or its user is saved or deleted. The cache is per
+    process, so the TTL bounds how long another process can keep serving a
+    revoked token.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_CACHE_TTL', 60)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (user, token, time.monotonic() + self.ttl)
+            self._keys_by_user[user.pk] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_pk):
+        with self._lock:
+            key = self._keys_by_user.get(user_pk)
+            if key is not None:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys_by_user.get(entry[0].pk) == key:
+            del self._keys_by_user[entry[0].pk]
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that skips the Token + user
+    lookup for keys seen recently.
+    """
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # Each request gets its own copy so views can't leak changes into the cache.
+            return copy.copy(user), token
+        try:
+            user, token = super().authenticate_credentials(key)
+        except AuthenticationFailed:
+            if not reading_from_replica():
+                raise
+            # The token may be newer than the replica has caught up to.
+            with use_primary():
+                user, token = super().authenticate_credentials(key)
+        token_cache.set(key, copy.copy(user), token)
+        return user, token
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashing import check_password, hash_password
+
+User = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords on the bounded hashing pool.
+
+    Like User.check_password, a correct password stored with an outdated
+    hasher or work factor is rehashed and saved. Raises
+    PasswordHashPoolSaturated when the pool is full.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash once anyway so unknown usernames take as long as known ones.
+            hash_password(password)
+            return None
+        is_correct, must_update = check_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
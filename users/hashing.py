@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+
+class PasswordHashPoolSaturated(Exception):
+    """
+    Raised instead of queueing when the password hashing pool is full.
+    """
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for password hashing and verification.
+
+    At most PASSWORD_HASH_WORKERS hashes run at once and at most
+    PASSWORD_HASH_QUEUE more wait for a worker; anything beyond that raises
+    PasswordHashPoolSaturated straight away so the view can answer 503 instead
+    of tying up a request worker. PBKDF2 runs in OpenSSL without the GIL, so
+    the other threads of the process keep serving requests while it runs.
+    Jobs never touch the database.
+    """
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def workers(self):
+        return getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+
+    @property
+    def queue_size(self):
+        return getattr(settings, 'PASSWORD_HASH_QUEUE', self.workers * 4)
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            return self._executor, self._slots
+
+    def run(self, func, *args):
+        executor, slots = self._start()
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashPoolSaturated()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            slots.release()
+            with self._lock:
+                self.completed += 1
+
+    def map(self, func, iterable):
+        """
+        `[func(item) for item in iterable]` on the pool, for bulk jobs.
+
+        Keeps at most `workers` jobs in flight and waits for free slots rather
+        than raising, leaving the queue to interactive logins.
+        """
+        executor, slots = self._start()
+
+        def done(future):
+            slots.release()
+            with self._lock:
+                self.completed += 1
+
+        results, pending = [], deque()
+        for item in iterable:
+            if len(pending) >= self.workers:
+                results.append(pending.popleft().result())
+            slots.acquire()
+            future = executor.submit(func, item)
+            future.add_done_callback(done)
+            pending.append(future)
+        results.extend(future.result() for future in pending)
+        return results
+
+    def shutdown(self):
+        """
+        Stop the workers; the pool restarts with current settings on next use.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'queue_size': self.queue_size,
+                    'completed': self.completed, 'rejected': self.rejected}
+
+
+password_hash_pool = PasswordHashPool()
+
+
+def hash_password(raw_password):
+    return password_hash_pool.run(make_password, raw_password)
+
+
+def check_password(raw_password, encoded):
+    """
+    Return (is_correct, must_update) for `raw_password` against `encoded`,
+    computed on the pool.
+    """
+    return password_hash_pool.run(verify_password, raw_password, encoded)
@@ -0,0 +1,97 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from products.seed import seed, unseed
+from users.hashing import password_hash_pool
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure catalog latency on its own and during a login storm, with password hashing '
+        'inline (ModelBackend) and on the bounded pool (PooledModelBackend).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--storm', type=int, default=32, help='Concurrent login threads.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per phase.')
+
+    def handle(self, *args, **options):
+        seed(users=1, products=200, services=10, requests=0)
+        user = User.objects.create_user(username='bench-login-storm', password='bench-password')
+        headers = {'Authorization': f'Token {Token.objects.create(user=user).key}'}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        try:
+            with override_settings(ALLOWED_HOSTS=hosts, SLOW_REQUEST_THRESHOLD=float('inf')):
+                baseline = self.catalog_latencies(headers, options['duration'])
+                self.report('no logins', baseline, {})
+                for label, backend in [
+                    ('inline hashing', 'django.contrib.auth.backends.ModelBackend'),
+                    ('pooled hashing', 'users.backends.PooledModelBackend'),
+                ]:
+                    password_hash_pool.shutdown()
+                    with override_settings(AUTHENTICATION_BACKENDS=[backend]):
+                        latencies, logins = self.storm(headers, options['storm'], options['duration'])
+                    self.report(label, latencies, logins)
+        finally:
+            password_hash_pool.shutdown()
+            user.delete()
+            unseed()
+
+    def catalog_latencies(self, headers, duration):
+        client = Client()
+        url = reverse('product-list-create')
+        latencies = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def storm(self, headers, threads, duration):
+        stop = threading.Event()
+        statuses = {}
+        lock = threading.Lock()
+
+        def login():
+            client = Client()
+            try:
+                while not stop.is_set():
+                    response = client.post(
+                        reverse('login'), {'username': 'bench-login-storm', 'password': 'bench-password'}
+                    )
+                    with lock:
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=login) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        try:
+            latencies = self.catalog_latencies(headers, duration)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        return latencies, statuses
+
+    def report(self, label, latencies, logins):
+        latencies = sorted(latencies)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        logins = ', '.join(f'{code}: {count}' for code, count in sorted(logins.items())) or '-'
+        self.stdout.write(
+            f'{label:<16} catalog p50 {statistics.median(latencies) * 1000:7.2f} ms  '
+            f'p95 {p95 * 1000:7.2f} ms  ({len(latencies)} requests)  logins {logins}'
+        )
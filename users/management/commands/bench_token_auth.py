@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from users.authentication import CachedTokenAuthentication, token_cache
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare queries and time per request for TokenAuthentication vs CachedTokenAuthentication.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='bench-token-auth', password=None)
+        token = Token.objects.create(user=user)
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        token_cache.clear()
+        try:
+            for auth_class in (TokenAuthentication, CachedTokenAuthentication):
+                authenticator = auth_class()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(options['requests']):
+                        authenticator.authenticate(request)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{auth_class.__name__}: '
+                    f'{len(queries) / options["requests"]:.3f} queries/request, '
+                    f'{elapsed / options["requests"] * 1e6:.1f} us/request'
+                )
+            self.stdout.write(f'cache: {token_cache.stats()}')
+        finally:
+            user.delete()
@@ -0,0 +1,39 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from products.importer import guess_format, read_rows
+from users.provisioning import UserProvisioner
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-create users and API tokens from a CSV or JSONL file with username, email, '
+        'password and phone columns, writing the tokens to a CSV file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--tokens', help='Where to write username,user_id,token; defaults to <path>.tokens.csv.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        with open(path, newline='', encoding='utf-8') as stream:
+            rows = (row for _, row in read_rows(stream, options['format'] or guess_format(path)))
+            report = UserProvisioner(chunk_size=options['chunk_size']).run(rows)
+
+        tokens_path = options['tokens'] or f'{path}.tokens.csv'
+        with open(tokens_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['username', 'user_id', 'token'])
+            writer.writerows([user['username'], user['user_id'], user['token']] for user in report['users'])
+
+        for reject in report['rejects']:
+            self.stderr.write(f'row {reject["row"]}: {json.dumps(reject["errors"])}')
+        self.stdout.write(
+            f'{report["processed"]} rows processed, {report["created"]} users created, '
+            f'{report["rejected"]} rejected in {report["seconds"]}s; tokens written to {tokens_path}'
+        )
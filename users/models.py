@@ -3,4 +3,5 @@ from django.db import models
 
 class CustomUser(AbstractUser):
     phone = models.CharField(max_length=15, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Lets ETags of payloads showing the username follow renames
     from django.db import models
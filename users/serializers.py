@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from .hashing import hash_password
+
 User = get_user_model()
 
 
@@ -13,13 +15,15 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'phone', 'is_staff']
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            phone=validated_data.get('phone', '')
+        # Hash on the bounded pool rather than in create_user(); may raise
+        # PasswordHashPoolSaturated.
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
+            phone=validated_data.get('phone', ''),
+            is_staff=validated_data.get('is_staff', False),
         )
-        user.is_staff = validated_data.get('is_staff', False)
+        user.password = hash_password(validated_data['password'])
         user.save()
         return user
 
@@ -28,3 +32,22 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
+
+
+class UserProvisionSerializer(serializers.Serializer):
+    """
+    One row of a bulk registration. Uniqueness is checked per chunk by
+    UserProvisioner rather than with a query per row.
+    """
+    username = serializers.CharField(max_length=150, validators=[User.username_validator])
+    email = serializers.EmailField(required=False, allow_blank=True)
+    password = serializers.CharField(required=False, write_only=True)
+    phone = serializers.CharField(max_length=15, required=False, allow_blank=True)
+
+    def validate_username(self, value):
+        return User.normalize_username(value)
+
+
+class BulkRegisterSerializer(serializers.Serializer):
+    # Rows are validated individually by UserProvisioner.
+    users = serializers.ListField(child=serializers.JSONField(), allow_empty=False, max_length=5000)
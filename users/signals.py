@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import token_cache
+
+
+@receiver([post_save, post_delete], sender='authtoken.Token')
+def invalidate_cached_token(sender, instance, **kwargs):
+    token_cache.invalidate_key(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
@@ -1,3 +1,150 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .authentication import token_cache
+from .hashing import password_hash_pool
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='driver', password='pass')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('user-dashboard')
+
+    def test_second_request_skips_token_lookup(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            token_cache.get(self.token.key)
+        hits = token_cache.stats()['hits']
+        self.client.get(self.url)
+        self.assertEqual(token_cache.stats()['hits'], hits + 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_lost_staff_is_seen(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('admin-dashboard')).status_code, 200)
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('admin-dashboard')).status_code, 403)
+
+
+class PasswordHashPoolTests(APITestCase):
+    def setUp(self):
+        password_hash_pool.shutdown()
+        self.addCleanup(password_hash_pool.shutdown)
+
+    def test_register_and_login(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'driver', 'email': 'driver@example.com', 'password': 'secret',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username='driver').check_password('secret'))
+        response = self.client.post(reverse('login'), {'username': 'driver', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('login'), {'username': 'driver', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_rehashes_outdated_password(self):
+        user = User.objects.create(username='driver', password=make_password('secret', hasher='pbkdf2_sha1'))
+        response = self.client.post(reverse('login'), {'username': 'driver', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password('secret'))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_saturated_pool_answers_503(self):
+        User.objects.create_user(username='driver', password='secret')
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+        blocker = threading.Thread(target=password_hash_pool.run, args=(block,))
+        blocker.start()
+        started.wait(5)
+        try:
+            response = self.client.post(reverse('login'), {'username': 'driver', 'password': 'secret'})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(password_hash_pool.stats()['rejected'], 1)
+        finally:
+            release.set()
+            blocker.join()
+        response = self.client.post(reverse('login'), {'username': 'driver', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkRegisterTests(APITestCase):
+    def setUp(self):
+        password_hash_pool.shutdown()
+        self.addCleanup(password_hash_pool.shutdown)
+        admin = User.objects.create_user(username='fleet-admin', password='pass', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+        User.objects.create_user(username='taken', password='pass')
+
+    def test_creates_users_and_tokens_with_per_row_errors(self):
+        rows = [{'username': f'driver-{i}', 'email': f'driver-{i}@fleet.example'} for i in range(20)]
+        rows += [
+            {'username': 'taken'},
+            {'username': 'driver-0'},
+            {'username': 'bad name!'},
+            'not an object',
+            {'username': 'with-password', 'password': 'secret'},
+        ]
+        response = self.client.post(reverse('register-bulk'), {'users': rows}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['rejected']), (21, 4))
+        self.assertEqual([reject['row'] for reject in response.data['rejects']], [21, 22, 23, 24])
+        created = {user['username']: user for user in response.data['users']}
+        self.assertEqual(Token.objects.get(user__username='driver-3').key, created['driver-3']['token'])
+        self.assertFalse(User.objects.get(username='driver-3').has_usable_password())
+        self.assertTrue(User.objects.get(username='with-password').check_password('secret'))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {created["driver-3"]["token"]}')
+        self.assertEqual(self.client.get(reverse('user-dashboard')).status_code, 200)
+
+    def test_reports_every_reject(self):
+        rows = [{'username': 'bad name!'} for _ in range(150)] + [{'username': 'driver-ok'}]
+        response = self.client.post(reverse('register-bulk'), {'users': rows}, format='json')
+
+        self.assertEqual((response.data['created'], response.data['rejected']), (1, 150))
+        self.assertEqual([reject['row'] for reject in response.data['rejects']], list(range(1, 151)))
+
+    def test_inserts_in_bulk(self):
+        rows = [{'username': f'driver-{i}'} for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('register-bulk'), {'users': rows}, format='json')
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(User.objects.filter(username__startswith='driver-').count(), 50)
+
+    def test_admin_only(self):
+        driver = User.objects.create_user(username='driver', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=driver).key}')
+        response = self.client.post(reverse('register-bulk'), {'users': [{'username': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, 403)
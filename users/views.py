@@ -2,18 +2,30 @@ from django.contrib.auth import authenticate
 from rest_framework.response import Response
 from rest_framework import status, views
 from rest_framework.authtoken.models import Token
-from .serializers import UserRegisterSerializer, UserLoginSerializer
+from .serializers import UserRegisterSerializer, UserLoginSerializer, BulkRegisterSerializer
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAdminUser
+from .hashing import PasswordHashPoolSaturated
+from .provisioning import UserProvisioner
 
 
 User = get_user_model()
 
+def hashing_unavailable():
+    return Response(
+        {"error": "Too many logins in progress, try again shortly"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
+
 class RegisterView(views.APIView):
     def post(self, request):
         serializer = UserRegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except PasswordHashPoolSaturated:
+                return hashing_unavailable()
             token, _ = Token.objects.get_or_create(user=user)
             return Response({"token": token.key, "user_id": user.id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -24,7 +36,10 @@ class LoginView(views.APIView):
         if serializer.is_valid():
             username = serializer.validated_data["username"]
             password = serializer.validated_data["password"]
-            user = authenticate(username=username, password=password)
+            try:
+                user = authenticate(username=username, password=password)
+            except PasswordHashPoolSaturated:
+                return hashing_unavailable()
             if user:
                 token, _ = Token.objects.get_or_create(user=user)
                 return Response({
@@ -35,6 +50,20 @@ class LoginView(views.APIView):
             return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BulkRegisterView(views.APIView):
+    """
+    Create up to 5,000 users and their tokens in one request; invalid rows are
+    reported with their row number and the rest are created.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkRegisterSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        report = UserProvisioner().run(serializer.validated_data["users"])
+        return Response(report, status=status.HTTP_200_OK)
+
 class AdminOnlyView(views.APIView):
     permission_classes = [IsAdminUser]
     def get(self, request):